@@ -4,43 +4,57 @@ Plugwise backend module for Home Assistant Core.
 """
 from __future__ import annotations
 
-import aiohttp
-from defusedxml import ElementTree as etree
-
-# Dict as class
-from munch import Munch
-
-# Version detection
-import semver
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, cast
 
+from .compact import compact_devices
 from .constants import (
     ADAM,
     APPLIANCES,
     DEFAULT_PORT,
     DEFAULT_TIMEOUT,
     DEFAULT_USERNAME,
+    DHW_SETPOINT,
     DOMAIN_OBJECTS,
     LOCATIONS,
     LOGGER,
+    MAX_GROUP_REQUESTS,
     MAX_SETPOINT,
     MIN_SETPOINT,
     NOTIFICATIONS,
+    PLATFORM_DICTS,
     RULES,
     SMILES,
     SWITCH_GROUP_TYPES,
     ZONE_THERMOSTATS,
     ActuatorData,
+    DeviceChanges,
     DeviceData,
-    GatewayData,
+    PlugwiseChanges,
     PlugwiseData,
+    SwitchSpec,
 )
 from .exceptions import (
     InvalidSetupError,
     PlugwiseError,
+    PlugwiseException,
     ResponseError,
+    SwitchGroupError,
     UnsupportedDeviceError,
 )
 from .helper import SmileComm, SmileHelper
+from .metrics import UpdateMetrics
+
+# The heavy modules are imported on first use, keeping "import plugwise" fast
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor
+
+    import aiohttp
+    from defusedxml import ElementTree as etree
+
+    from .cache import DiscoveryCache
 
 
 def remove_empty_platform_dicts(data: DeviceData) -> DeviceData:
@@ -55,6 +69,47 @@ def remove_empty_platform_dicts(data: DeviceData) -> DeviceData:
     return data
 
 
+def changed_keys(previous: dict[str, Any], current: dict[str, Any]) -> set[str]:
+    """Helper-function collecting the keys with a new, changed or removed value."""
+    changed = {key for key in previous if key not in current}
+    for key, value in current.items():
+        if key not in previous or previous[key] != value:
+            changed.add(key)
+
+    return changed
+
+
+def collect_changes(previous: PlugwiseData, current: PlugwiseData) -> PlugwiseChanges:
+    """Collect the gateway fields, devices and device items changed between two updates."""
+    changes = PlugwiseChanges(
+        gateway=changed_keys(
+            cast(dict[str, Any], previous.gateway),
+            cast(dict[str, Any], current.gateway),
+        ),
+        removed_devices=set(previous.devices) - set(current.devices),
+    )
+    for dev_id, device in current.devices.items():
+        prev_device = cast(dict[str, Any], previous.devices.get(dev_id, {}))
+        cur_device = cast(dict[str, Any], device)
+        dev_changes: dict[str, set[str]] = {}
+        for platform in PLATFORM_DICTS:
+            if changed := changed_keys(
+                prev_device.get(platform, {}), cur_device.get(platform, {})
+            ):
+                dev_changes[platform] = changed
+
+        if attributes := changed_keys(
+            {k: v for k, v in prev_device.items() if k not in PLATFORM_DICTS},
+            {k: v for k, v in cur_device.items() if k not in PLATFORM_DICTS},
+        ):
+            dev_changes["attributes"] = attributes
+
+        if dev_changes:
+            changes.devices[dev_id] = cast(DeviceChanges, dev_changes)
+
+    return changes
+
+
 class SmileData(SmileHelper):
     """The Plugwise Smile main class."""
 
@@ -89,26 +144,34 @@ class SmileData(SmileHelper):
 
         Collect data for each device and add to self.gw_devices.
         """
+        if self.smile(ADAM):
+            self._heating_valves()
+
         for device_id, device in self.gw_devices.items():
-            data = self._get_device_data(device_id)
-            if (
-                "binary_sensors" in device
-                and "plugwise_notification" in device["binary_sensors"]
-            ) or (
-                device_id == self.gateway_id
-                and (self._is_thermostat or self.smile_type == "power")
-            ):
-                data["binary_sensors"]["plugwise_notification"] = bool(
-                    self._notifications
-                )
-                self._count += 1
-            device.update(data)
+            self._update_device(device_id, device)
+
+    def _update_device(self, device_id: str, device: DeviceData) -> None:
+        """Helper-function for _update_gw_devices() and _recollect_devices().
+
+        Collect the data of a device and add to its device record.
+        """
+        data = self._get_device_data(device_id)
+        if (
+            "binary_sensors" in device
+            and "plugwise_notification" in device["binary_sensors"]
+        ) or (
+            device_id == self.gateway_id
+            and (self._is_thermostat or self.smile_type == "power")
+        ):
+            data["binary_sensors"]["plugwise_notification"] = bool(self._notifications)
+            self._count += 1
+        device.update(data)
 
-            # Update for cooling
-            if device["dev_class"] in ZONE_THERMOSTATS and not self.smile(ADAM):
-                self.update_for_cooling(device)
+        # Update for cooling
+        if device["dev_class"] in ZONE_THERMOSTATS and not self.smile(ADAM):
+            self.update_for_cooling(device)
 
-            remove_empty_platform_dicts(device)
+        remove_empty_platform_dicts(device)
 
     def _all_device_data(self) -> None:
         """Helper-function for get_all_devices().
@@ -140,6 +203,8 @@ class SmileData(SmileHelper):
         Run this functions once to gather the initial device configuration,
         then regularly run async_update() to refresh the device data.
         """
+        self.gw_data = {}
+        self.gw_devices = {}
         # Gather all the devices and their initial data
         self._all_appliances()
         if self.smile_type == "thermostat":
@@ -153,9 +218,66 @@ class SmileData(SmileHelper):
         if group_data := self._get_group_switches():
             self.gw_devices.update(group_data)
 
+        # Store the discovery results, used by refresh_devices(), in compact form
+        self._device_info = compact_devices(self.gw_devices)
+        self._discovery_count = self._count
+        self._topology = self._get_topology()
+
         # Collect the remaining data for all device
         self._all_device_data()
 
+    def refresh_devices(self) -> None:
+        """Refresh the data of the devices found by get_all_devices().
+
+        The device configuration is kept, only the measurements, actuators
+        and states are collected again, into new device records: the records
+        provided by the previous update are not changed.
+        """
+        self._count = self._discovery_count
+        self.gw_data = {}
+        self.gw_devices = {
+            dev_id: self._device_info[dev_id].to_dict() for dev_id in self.gw_devices
+        }
+
+        self._all_device_data()
+
+    def _recollect_devices(self, dev_ids: list[str]) -> None:
+        """Helper-function for _confirm_write().
+
+        Collect the data of the given devices again, from the cached XML-data.
+        """
+        count = self._count
+        for dev_id in dev_ids:
+            device = self.gw_devices[dev_id]
+            device.clear()
+            device.update(self._device_info[dev_id].to_dict())
+            self._update_device(dev_id, device)
+        self._count = count
+
+    def _patch_device(self, dev_id: str, patch: dict[str, Any]) -> None:
+        """Helper-function for _confirm_write().
+
+        Update the items present in the device record with the patch-values.
+        """
+        device = cast(dict[str, Any], self.gw_devices[dev_id])
+        for key, value in patch.items():
+            if key not in device:
+                continue
+            if isinstance(value, dict):
+                for item, item_value in value.items():
+                    if item in device[key]:
+                        device[key][item] = item_value
+                continue
+            device[key] = value
+
+    def _zone_thermostats(self, loc_id: str) -> list[str]:
+        """Helper-function for the setters: the thermostat-devices of a location."""
+        return [
+            dev_id
+            for dev_id in self._loc_devices.get(loc_id, [])
+            if self.gw_devices[dev_id]["dev_class"] in ZONE_THERMOSTATS
+        ]
+
     def _device_data_switching_group(
         self, device: DeviceData, device_data: DeviceData
     ) -> DeviceData:
@@ -186,9 +308,9 @@ class SmileData(SmileHelper):
             self.smile(ADAM)
             and device.get("dev_class") == "heater_central"
             and self._on_off_device
-            and isinstance(self._heating_valves(), int)
+            and isinstance(self._open_valves, int)
         ):
-            device_data["binary_sensors"]["heating_state"] = self._heating_valves() != 0
+            device_data["binary_sensors"]["heating_state"] = self._open_valves != 0
 
         return device_data
 
@@ -296,6 +418,16 @@ class SmileData(SmileHelper):
                 device_data["sensors"]["outdoor_temperature"] = outdoor_temperature
                 self._count += 1
 
+            # Adam: show the average and maximum valve-position
+            if self._valve_positions:
+                device_data["sensors"]["average_valve_position"] = round(
+                    sum(self._valve_positions) / len(self._valve_positions), 1
+                )
+                device_data["sensors"]["maximum_valve_position"] = max(
+                    self._valve_positions
+                )
+                self._count += 2
+
             # Show the allowed regulation modes
             if self._reg_allowed_modes:
                 device_data["regulation_modes"] = self._reg_allowed_modes
@@ -336,8 +468,32 @@ class Smile(SmileComm, SmileData):
         port: int = DEFAULT_PORT,
         timeout: float = DEFAULT_TIMEOUT,
         websession: aiohttp.ClientSession | None = None,
+        offload: bool = False,
+        executor: Executor | None = None,
+        optimistic: bool = False,
+        verify: bool = False,
+        command_queue: bool = False,
+        discovery_cache: DiscoveryCache | None = None,
     ) -> None:
-        """Set the constructor for this class."""
+        """Set the constructor for this class.
+
+        With offload=True the XML-parsing and the processing of the data, in async_update(),
+        run in the executor instead of on the event loop. The default executor is the thread pool
+        of the event loop. With a process pool only the parsing runs in the process pool,
+        the processing needs the state of this object and runs in the default thread pool.
+        Each update provides new device records, the setters wait while the data is processed.
+
+        With optimistic=True a setter patches the cached device data with the data it has sent.
+        With verify=True a setter collects the affected appliances/locations from the Smile
+        and collects the data of the affected devices again, without a full update.
+
+        With command_queue=True the writes are sent one at a time, in order, the last write
+        still waiting is superseded by a newer write of the same elements to the same target.
+
+        With a discovery_cache connect() uses the cached detection-results, without requests,
+        the first async_update() verifies the MAC-address and firmware-version of the gateway
+        and uses the cached discovery-results when unchanged.
+        """
         super().__init__(
             host,
             password,
@@ -345,16 +501,58 @@ class Smile(SmileComm, SmileData):
             port,
             timeout,
             websession,
+            offload,
+            executor,
+            command_queue,
         )
         SmileData.__init__(self)
 
+        self._cached_entry: dict[str, Any] | None = None
+        self._discovery_cache = discovery_cache
         self.smile_hostname: str | None = None
+        self._optimistic = optimistic
         self._previous_day_number: str = "0"
         self._target_smile: str | None = None
+        self._transform_executor = executor
+        if executor is not None:
+            from concurrent.futures import (  # pylint: disable=import-outside-toplevel
+                ProcessPoolExecutor,
+            )
+
+            if isinstance(executor, ProcessPoolExecutor):
+                self._transform_executor = None
+        self._update_lock = asyncio.Lock()
+        self._update_metrics: UpdateMetrics | None = None
+        self._verify = verify
 
     async def connect(self) -> bool:
-        """Connect to Plugwise device and determine its name, type and version."""
+        """Connect to Plugwise device and determine its name, type and version.
+
+        With a cached discovery no request is sent: the credentials, the reachability
+        and the cached data are validated at the first async_update(), which must
+        precede the setter-calls.
+        """
+        if self._discovery_cache is not None:
+            await self._discovery_cache.async_load()
+            if (entry := self._discovery_cache.lookup(self._endpoint)) is not None:
+                LOGGER.debug("Plugwise %s: using the cached discovery", self._endpoint)
+                self._restore_detection(entry)
+                self._cached_entry = entry
+                return True
+
         result = await self._request(DOMAIN_OBJECTS)
+        await self._identify(result)
+
+        # Update all endpoints on first connect
+        await self._full_update_device()
+
+        return True
+
+    async def _identify(self, result: etree) -> None:
+        """Helper-function for connect() and _verify_cached_entry().
+
+        Check the vendor and setup, detect the type of Smile.
+        """
         vendor_names = result.findall("./module/vendor_name")
 
         names: list[str] = []
@@ -385,11 +583,6 @@ class Smile(SmileComm, SmileData):
         # Determine smile specifics
         await self._smile_detect(result, dsmrmain)
 
-        # Update all endpoints on first connect
-        await self._full_update_device()
-
-        return True
-
     async def _smile_detect(self, result: etree, dsmrmain: etree) -> None:
         """Helper-function for connect().
 
@@ -412,21 +605,20 @@ class Smile(SmileComm, SmileData):
             )
             raise UnsupportedDeviceError
 
+        import semver  # pylint: disable=import-outside-toplevel
+
         ver = semver.version.Version.parse(self.smile_fw_version)
-        self._target_smile = f"{model}_v{ver.major}"
-        LOGGER.debug("Plugwise identified as %s", self._target_smile)
-        if self._target_smile not in SMILES:
+        target_smile = f"{model}_v{ver.major}"
+        LOGGER.debug("Plugwise identified as %s", target_smile)
+        if target_smile not in SMILES:
             LOGGER.error(
                 "Your version Smile identified as %s seems unsupported by our plugin, please"
                 " create an issue on http://github.com/plugwise/python-plugwise",
-                self._target_smile,
+                target_smile,
             )
             raise UnsupportedDeviceError
 
-        self.smile_model = "Gateway"
-        self.smile_name = SMILES[self._target_smile].smile_name
-        self.smile_type = SMILES[self._target_smile].smile_type
-        self.smile_version = (self.smile_fw_version, ver)
+        self._set_smile_type(target_smile)
 
         if self.smile_type == "thermostat":
             self._is_thermostat = True
@@ -448,16 +640,148 @@ class Smile(SmileComm, SmileData):
             if result.find(locator_2) is not None:
                 self._elga = True
 
-    async def _update_domain_objects(self) -> None:
+    def _set_smile_type(self, target_smile: str) -> None:
+        """Helper-function for _smile_detect() and _restore_detection()."""
+        import semver  # pylint: disable=import-outside-toplevel
+
+        self._target_smile = target_smile
+        self.smile_model = "Gateway"
+        self.smile_name = SMILES[target_smile].smile_name
+        self.smile_type = SMILES[target_smile].smile_type
+        self.smile_version = (
+            cast(str, self.smile_fw_version),
+            semver.version.Version.parse(self.smile_fw_version),
+        )
+
+    def _restore_detection(self, entry: dict[str, Any]) -> None:
+        """Helper-function for connect().
+
+        Restore the results of _smile_detect() from a discovery-cache entry.
+        """
+        self.smile_fw_version = entry["firmware_version"]
+        self.smile_hw_version = entry["hardware_version"]
+        self.smile_hostname = entry["hostname"]
+        self.smile_mac_address = entry["mac_address"]
+        self._set_smile_type(entry["target_smile"])
+        self._cooling_present = entry["cooling_present"]
+        self._elga = entry["elga"]
+        self._is_thermostat = entry["is_thermostat"]
+        self._on_off_device = entry["on_off_device"]
+        self._opentherm_device = entry["opentherm_device"]
+
+    def _restore_discovery(self, entry: dict[str, Any]) -> None:
+        """Helper-function for _verify_cached_entry().
+
+        Restore the results of get_all_devices() from a discovery-cache entry,
+        async_update() then refreshes the devices when the topology is unchanged.
+        """
+        self.gateway_id = entry["gateway_id"]
+        if entry["heater_id"] is not None:
+            self._heater_id = entry["heater_id"]
+        if entry["home_location"] is not None:
+            self._home_location = entry["home_location"]
+        self._dhw_allowed_modes = entry["dhw_allowed_modes"]
+        self._reg_allowed_modes = entry["reg_allowed_modes"]
+        self._loc_data = entry["loc_data"]
+        for loc_data in self._loc_data.values():
+            if "slaves" in loc_data:
+                loc_data["slaves"] = set(loc_data["slaves"])
+        self._thermo_locs = {
+            loc_id: self._loc_data[loc_id] for loc_id in entry["thermo_locs"]
+        }
+        self._loc_devices = entry["loc_devices"]
+        self.therms_with_offset_func = entry["therms_with_offset_func"]
+        self._device_info = compact_devices(entry["device_info"])
+        self._discovery_count = entry["discovery_count"]
+        self._topology = frozenset(entry["topology"])
+        self.gw_data = {}
+        self.gw_devices = {dev_id: {} for dev_id in self._device_info}
+
+    def _discovery_entry(self) -> dict[str, Any]:
+        """Helper-function for async_update().
+
+        Collect the detection- and discovery-results for the discovery cache.
+        """
+        loc_data: dict[str, dict[str, Any]] = {}
+        for loc_id, data in self._loc_data.items():
+            loc_data[loc_id] = dict(data)
+            if "slaves" in data:
+                loc_data[loc_id]["slaves"] = sorted(data["slaves"])
+
+        return {
+            "endpoint": self._endpoint,
+            "mac_address": self.smile_mac_address,
+            "firmware_version": self.smile_fw_version,
+            "hardware_version": self.smile_hw_version,
+            "hostname": self.smile_hostname,
+            "target_smile": self._target_smile,
+            "cooling_present": self._cooling_present,
+            "elga": self._elga,
+            "is_thermostat": self._is_thermostat,
+            "on_off_device": self._on_off_device,
+            "opentherm_device": self._opentherm_device,
+            "gateway_id": self.gateway_id,
+            "heater_id": getattr(self, "_heater_id", None),
+            "home_location": getattr(self, "_home_location", None),
+            "dhw_allowed_modes": self._dhw_allowed_modes,
+            "reg_allowed_modes": self._reg_allowed_modes,
+            "loc_data": loc_data,
+            "thermo_locs": list(self._thermo_locs),
+            "loc_devices": self._loc_devices,
+            "therms_with_offset_func": self.therms_with_offset_func,
+            "device_info": {
+                dev_id: device.to_dict() for dev_id, device in self._device_info.items()
+            },
+            "discovery_count": self._discovery_count,
+            "topology": sorted(self._topology),
+        }
+
+    async def _verify_cached_entry(self, result: etree) -> None:
+        """Helper-function for async_update().
+
+        Use the cached discovery-results when the gateway has the cached MAC-address
+        and firmware-version, otherwise detect the type of Smile again.
+        """
+        entry = cast(dict[str, Any], self._cached_entry)
+        self._cached_entry = None
+        if (
+            (gateway := result.find("./gateway")) is not None
+            and gateway.find("mac_address").text == entry["mac_address"]
+            and gateway.find("firmware_version").text == entry["firmware_version"]
+        ):
+            self._restore_discovery(entry)
+            return
+
+        LOGGER.debug("Plugwise %s: the cached discovery is outdated", self._endpoint)
+        self._cooling_present = False
+        self._elga = False
+        self._is_thermostat = False
+        self._on_off_device = False
+        self._opentherm_device = False
+        await self._identify(result)
+
+    async def _update_domain_objects(self) -> bool:
         """Helper-function for smile.py: full_update_device() and async_update().
 
-        Request domain_objects data.
+        Request domain_objects data, return False when not modified since the previous request.
+        """
+        if (result := await self._request(DOMAIN_OBJECTS, conditional=True)) is None:
+            return False
+
+        self._domain_objects = result
+        self._process_domain_objects()
+        return True
+
+    def _process_domain_objects(self) -> None:
+        """Helper-function for _update_domain_objects() and _update_data().
+
+        Index the received domain_objects and collect the notifications.
         """
-        self._domain_objects = await self._request(DOMAIN_OBJECTS)
+        self._index_domain_objects()
 
         # If Plugwise notifications present:
         self._notifications = {}
-        for notification in self._domain_objects.findall("./notification"):
+        for notification in self._domain_notifications.values():
             try:
                 msg_id = notification.attrib["id"]
                 msg_type = notification.find("type").text
@@ -470,37 +794,163 @@ class Smile(SmileComm, SmileData):
                     f"{self._endpoint}{DOMAIN_OBJECTS}",
                 )
 
-    async def _full_update_device(self) -> None:
+    async def _full_update_device(self) -> bool:
         """Perform a first fetch of all XML data, needed for initialization."""
-        await self._update_domain_objects()
+        return await self._update_domain_objects()
 
     async def async_update(self) -> PlugwiseData:
-        """Perform an incremental update for updating the various device states."""
-        self.gw_data: GatewayData = {}
-        self.gw_devices: dict[str, DeviceData] = {}
-        await self._full_update_device()
-        self.get_all_devices()
+        """Perform an incremental update for updating the various device states.
+
+        The changes-field of the output shows what changed since the previous update.
+        Updates are serialized, with offload=True the data is processed in the executor.
+        """
+        async with self._update_lock:
+            result = await self._request(DOMAIN_OBJECTS, conditional=True)
+            if self._cached_entry is not None and result is not None:
+                await self._verify_cached_entry(result)
+            # Nothing changed on the Smile, provide the previous data
+            if result is None and self.gw_devices:
+                return PlugwiseData(self.gw_data, self.gw_devices)
+
+            if not self._offload:
+                data = self._update_data(result)
+            else:
+                # The finished PlugwiseData is handed back via the executor-future
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(
+                    self._transform_executor, self._update_data, result
+                )
+
+            if (metrics := self._update_metrics) is not None:
+                self._emit_metrics(metrics)
+                if metrics.discovery and self._discovery_cache is not None:
+                    self._discovery_cache.store(self._discovery_entry())
+                    await self._discovery_cache.async_save()
+            return data
+
+    def _update_data(self, result: etree | None) -> PlugwiseData:
+        """Helper-function for async_update().
+
+        Process the received domain_objects into the device data.
+        """
+        start = time.perf_counter()
+        if result is not None:
+            self._domain_objects = result
+            self._process_domain_objects()
+
+        # The discovery and the refresh collect new records, the previous ones are kept
+        previous = PlugwiseData(self.gw_data, self.gw_devices)
+
+        # Only run the device discovery when the topology has changed
+        discovery = not self.gw_devices or self._get_topology() != self._topology
+        if discovery:
+            self.get_all_devices()
+        else:
+            self.refresh_devices()
+
+        current = PlugwiseData(self.gw_data, self.gw_devices)
+        current.changes = collect_changes(previous, current)
+        # Provided to the metrics-listeners by async_update(), on the event loop
+        self._update_metrics = UpdateMetrics(
+            discovery,
+            time.perf_counter() - start,
+            len(self.gw_devices),
+            self._count,
+        )
+        return current
+
+    async def _fetch_object(self, kind: str, obj_id: str) -> None:
+        """Helper-function for _confirm_write().
+
+        Collect a single appliance or location and replace the cached one.
+        """
+        index, uri = self._appliances, APPLIANCES
+        if kind == "location":
+            index, uri = self._locations, LOCATIONS
+        result = await self._request(f"{uri};id={obj_id}")
+        if result.tag != kind:
+            result = result.find(f"./{kind}[@id='{obj_id}']")
+        if result is None:
+            raise ResponseError
+
+        children = list(self._domain_objects)
+        self._domain_objects[children.index(index[obj_id])] = result
+        index[obj_id] = result
+
+    async def _confirm_write(
+        self,
+        patches: dict[str, dict[str, Any]],
+        objects: list[tuple[str, str]] | None = None,
+        climate: list[str] | None = None,
+        patch_data: Callable[[], None] | None = None,
+    ) -> None:
+        """Helper-function for the setters, with optimistic=True or verify=True.
 
-        return PlugwiseData(self.gw_data, self.gw_devices)
+        The patches contain the data sent per device, the objects the appliances/locations
+        changed by the write, the climate-devices derive their mode, schedules and presets
+        from the changed data. The patch_data callback changes the other cached data.
+        """
+        if not (self._optimistic or self._verify):
+            return
+
+        async with self._update_lock:
+            if patch_data is not None:
+                patch_data()
+            if self._verify:
+                try:
+                    for kind, obj_id in objects or []:
+                        await self._fetch_object(kind, obj_id)
+                except PlugwiseException as err:
+                    LOGGER.warning("Plugwise: verifying the write failed: %r", err)
+                else:
+                    self._recollect_devices(
+                        list(dict.fromkeys([*patches, *(climate or [])]))
+                    )
+                    return
+
+            for dev_id, patch in patches.items():
+                self._patch_device(dev_id, patch)
+            count = self._count
+            for dev_id in climate or []:
+                device = self.gw_devices[dev_id]
+                device.update(self._device_data_climate(device, {}))
+            self._count = count
 
     def determine_contexts(
         self, loc_id: str, name: str, state: str, sched_id: str
     ) -> etree:
         """Helper-function for set_schedule_state()."""
-        locator = f'.//*[@id="{sched_id}"]/contexts'
-        contexts = self._domain_objects.find(locator)
+        from defusedxml.ElementTree import (  # pylint: disable=import-outside-toplevel
+            fromstring,
+            tostring,
+        )
+
+        contexts = self._rules[sched_id].find("contexts")
         locator = f'.//*[@id="{loc_id}"].../...'
         if (subject := contexts.find(locator)) is None:
             subject = f'<context><zone><location id="{loc_id}" /></zone></context>'
-            subject = etree.fromstring(subject)
+            subject = fromstring(subject)
 
+        # Keep the rule-locations index in line with the changed contexts
         if state == "off":
             self._last_active[loc_id] = name
             contexts.remove(subject)
+            self._rule_locations[sched_id].discard(loc_id)
         if state == "on":
             contexts.append(subject)
+            self._rule_locations[sched_id].add(loc_id)
 
-        return etree.tostring(contexts, encoding="unicode").rstrip()
+        return tostring(contexts, encoding="unicode").rstrip()
+
+    def _check_updated(self) -> None:
+        """Helper-function for the setters.
+
+        Raise an error when connected from the discovery cache, before the first update.
+        """
+        if self._cached_entry is not None:
+            raise PlugwiseError(
+                "Plugwise: no data available yet, call async_update() first."
+            )
 
     async def set_schedule_state(
         self,
@@ -513,36 +963,42 @@ class Smile(SmileComm, SmileData):
         Determined from - DOMAIN_OBJECTS.
         Used in HA Core to set the hvac_mode: in practice switch between schedule on - off.
         """
+        self._check_updated()
         # Input checking
         if new_state not in ["on", "off"]:
             raise PlugwiseError("Plugwise: invalid schedule state.")
-        if name is None:
-            if schedule_name := self._last_active[loc_id]:
-                name = schedule_name
-            else:
-                return
 
-        assert isinstance(name, str)
-        schedule_rule = self._rule_ids_by_name(name, loc_id)
-        # Raise an error when the schedule name does not exist
-        if not schedule_rule or schedule_rule is None:
-            raise PlugwiseError("Plugwise: no schedule with this name available.")
+        async with self._update_lock:
+            if name is None:
+                if schedule_name := self._last_active[loc_id]:
+                    name = schedule_name
+                else:
+                    return
+
+            assert isinstance(name, str)
+            schedule_rule = self._rule_ids_by_name(name, loc_id)
+            # Raise an error when the schedule name does not exist
+            if not schedule_rule or schedule_rule is None:
+                raise PlugwiseError("Plugwise: no schedule with this name available.")
+
+            # If no state change is requested, do nothing
+            if new_state == self._schedule_old_states[loc_id][name]:
+                return
 
-        # If no state change is requested, do nothing
-        if new_state == self._schedule_old_states[loc_id][name]:
-            return
+            schedule_rule_id: str = next(iter(schedule_rule))
 
-        schedule_rule_id: str = next(iter(schedule_rule))
+            template = '<template tag="zone_preset_based_on_time_and_presence_with_override" />'
+            if not self.smile(ADAM):
+                template_id = (
+                    self._rules[schedule_rule_id].find("template").attrib["id"]
+                )
+                template = f'<template id="{template_id}" />'
 
-        template = (
-            '<template tag="zone_preset_based_on_time_and_presence_with_override" />'
-        )
-        if not self.smile(ADAM):
-            locator = f'.//*[@id="{schedule_rule_id}"]/template'
-            template_id = self._domain_objects.find(locator).attrib["id"]
-            template = f'<template id="{template_id}" />'
+            contexts = self.determine_contexts(
+                loc_id, name, new_state, schedule_rule_id
+            )
+            thermostats = self._zone_thermostats(loc_id)
 
-        contexts = self.determine_contexts(loc_id, name, new_state, schedule_rule_id)
         uri = f"{RULES};id={schedule_rule_id}"
         data = (
             f'<rules><rule id="{schedule_rule_id}"><name><![CDATA[{name}]]></name>'
@@ -550,15 +1006,22 @@ class Smile(SmileComm, SmileData):
         )
         await self._request(uri, method="put", data=data)
         self._schedule_old_states[loc_id][name] = new_state
+        # The changed rule-contexts are cached already
+        await self._confirm_write({}, climate=thermostats)
 
     async def set_preset(self, loc_id: str, preset: str) -> None:
         """Set the given Preset on the relevant Thermostat - from LOCATIONS."""
-        if (presets := self._presets(loc_id)) is None:
+        self._check_updated()
+        async with self._update_lock:
+            presets = self._presets(loc_id)
+            current_location = self._locations[loc_id]
+            thermostats = self._zone_thermostats(loc_id)
+
+        if presets is None:
             raise PlugwiseError("Plugwise: no presets available.")  # pragma: no cover
         if preset not in list(presets):
             raise PlugwiseError("Plugwise: invalid preset.")
 
-        current_location = self._domain_objects.find(f'location[@id="{loc_id}"]')
         location_name = current_location.find("name").text
         location_type = current_location.find("type").text
 
@@ -570,9 +1033,14 @@ class Smile(SmileComm, SmileData):
         )
 
         await self._request(uri, method="put", data=data)
+        await self._confirm_write(
+            {dev_id: {"active_preset": preset} for dev_id in thermostats},
+            [("location", loc_id)] + [("appliance", dev_id) for dev_id in thermostats],
+        )
 
     async def set_temperature(self, loc_id: str, items: dict[str, float]) -> None:
         """Set the given Temperature on the relevant Thermostat."""
+        self._check_updated()
         setpoint: float | None = None
 
         if "setpoint" in items:
@@ -604,23 +1072,39 @@ class Smile(SmileComm, SmileData):
             )  # pragma: no cover"
 
         temperature = str(setpoint)
-        uri = self._thermostat_uri(loc_id)
+        async with self._update_lock:
+            uri = self._thermostat_uri(loc_id)
+            thermostats = self._zone_thermostats(loc_id)
         data = (
             "<thermostat_functionality><setpoint>"
             f"{temperature}</setpoint></thermostat_functionality>"
         )
 
         await self._request(uri, method="put", data=data)
+        setpoints = {
+            key: value
+            for key, value in items.items()
+            if key in ("setpoint", "setpoint_high", "setpoint_low")
+        }
+        await self._confirm_write(
+            {
+                dev_id: {"sensors": setpoints, "thermostat": setpoints}
+                for dev_id in thermostats
+            },
+            [("appliance", dev_id) for dev_id in thermostats],
+        )
 
     async def set_number_setpoint(self, key: str, _: str, temperature: float) -> None:
         """Set the max. Boiler or DHW setpoint on the Central Heating boiler."""
+        self._check_updated()
         temp = str(temperature)
         thermostat_id: str | None = None
-        locator = f'appliance[@id="{self._heater_id}"]/actuator_functionalities/thermostat_functionality'
-        if th_func_list := self._domain_objects.findall(locator):
-            for th_func in th_func_list:
-                if th_func.find("type").text == key:
-                    thermostat_id = th_func.attrib["id"]
+        locator = "./actuator_functionalities/thermostat_functionality"
+        async with self._update_lock:
+            th_func_list = self._appliances[self._heater_id].findall(locator)
+        for th_func in th_func_list:
+            if th_func.find("type").text == key:
+                thermostat_id = th_func.attrib["id"]
 
         if thermostat_id is None:
             raise PlugwiseError(f"Plugwise: cannot change setpoint, {key} not found.")
@@ -628,9 +1112,15 @@ class Smile(SmileComm, SmileData):
         uri = f"{APPLIANCES};id={self._heater_id}/thermostat;id={thermostat_id}"
         data = f"<thermostat_functionality><setpoint>{temp}</setpoint></thermostat_functionality>"
         await self._request(uri, method="put", data=data)
+        item = "max_dhw_temperature" if key == DHW_SETPOINT else key
+        await self._confirm_write(
+            {self._heater_id: {item: {"setpoint": temperature}}},
+            [("appliance", self._heater_id)],
+        )
 
     async def set_temperature_offset(self, _: str, dev_id: str, offset: float) -> None:
         """Set the Temperature offset for thermostats that support this feature."""
+        self._check_updated()
         if dev_id not in self.therms_with_offset_func:
             raise PlugwiseError(
                 "Plugwise: this device does not have temperature-offset capability."
@@ -641,31 +1131,63 @@ class Smile(SmileComm, SmileData):
         data = f"<offset_functionality><offset>{value}</offset></offset_functionality>"
 
         await self._request(uri, method="put", data=data)
+        await self._confirm_write(
+            {dev_id: {"temperature_offset": {"setpoint": offset}}},
+            [("appliance", dev_id)],
+        )
 
     async def _set_groupswitch_member_state(
-        self, members: list[str], state: str, switch: Munch
-    ) -> None:
+        self, members: list[str], state: str, switch: SwitchSpec
+    ) -> dict[str, PlugwiseException]:
         """Helper-function for set_switch_state().
 
-        Set the given State of the relevant Switch within a group of members.
+        Set the given State of the relevant Switch within a group of members,
+        with at most MAX_GROUP_REQUESTS requests at the same time.
+        Return the errors per member.
         """
-        for member in members:
-            locator = f'appliance[@id="{member}"]/{switch.actuator}/{switch.func_type}'
-            switch_id = self._domain_objects.find(locator).attrib["id"]
-            uri = f"{APPLIANCES};id={member}/{switch.device};id={switch_id}"
-            data = f"<{switch.func_type}><{switch.func}>{state}</{switch.func}></{switch.func_type}>"
+        locator = f"./{switch.actuator}/{switch.func_type}"
+        async with self._update_lock:
+            switch_ids = {
+                member: self._appliances[member].find(locator).attrib["id"]
+                for member in members
+            }
+        uris = {
+            member: f"{APPLIANCES};id={member}/{switch.device};id={switch_id}"
+            for member, switch_id in switch_ids.items()
+        }
+        data = f"<{switch.func_type}><{switch.func}>{state}</{switch.func}></{switch.func_type}>"
+
+        limit = asyncio.Semaphore(MAX_GROUP_REQUESTS)
+
+        async def _switch_member(uri: str) -> None:
+            async with limit:
+                await self._request(uri, method="put", data=data)
 
-            await self._request(uri, method="put", data=data)
+        results = await asyncio.gather(
+            *(_switch_member(uri) for uri in uris.values()), return_exceptions=True
+        )
+        errors: dict[str, PlugwiseException] = {}
+        for member, result in zip(uris, results):
+            if isinstance(result, PlugwiseException):
+                LOGGER.warning(
+                    "Plugwise: switching member %s failed: %r", member, result
+                )
+                errors[member] = result
+            elif isinstance(result, BaseException):
+                raise result  # pragma: no cover
+
+        return errors
 
     async def set_switch_state(
         self, appl_id: str, members: list[str] | None, model: str, state: str
     ) -> None:
-        """Set the given State of the relevant Switch."""
-        switch = Munch()
-        switch.actuator = "actuator_functionalities"
-        switch.device = "relay"
-        switch.func_type = "relay_functionality"
-        switch.func = "state"
+        """Set the given State of the relevant Switch.
+
+        For a switch-group all members are switched, when switching members failed
+        a SwitchGroupError is raised, holding the error per failed member.
+        """
+        self._check_updated()
+        switch = SwitchSpec()
         if model == "dhw_cm_switch":
             switch.device = "toggle"
             switch.func_type = "toggle_functionality"
@@ -681,10 +1203,23 @@ class Smile(SmileComm, SmileData):
             state = "false" if state == "off" else "true"
 
         if members is not None:
-            return await self._set_groupswitch_member_state(members, state, switch)
+            errors = await self._set_groupswitch_member_state(members, state, switch)
+            switched = [member for member in members if member not in errors]
+            # The group-state is known only when all members are switched
+            devices = switched if errors else [*switched, appl_id]
+            patch = {"switches": {"relay": state == "on"}}
+            await self._confirm_write(
+                {dev_id: patch for dev_id in devices},
+                [("appliance", member) for member in switched],
+            )
+            if errors:
+                raise SwitchGroupError(errors) from next(iter(errors.values()))
+            return
 
-        locator = f'appliance[@id="{appl_id}"]/{switch.actuator}/{switch.func_type}'
-        found: list[etree] = self._domain_objects.findall(locator)
+        async with self._update_lock:
+            appliance = self._appliances[appl_id]
+        locator = f"./{switch.actuator}/{switch.func_type}"
+        found: list[etree] = appliance.findall(locator)
         for item in found:
             if (sw_type := item.find("type")) is not None:
                 if sw_type.text == switch.act_type:
@@ -697,17 +1232,20 @@ class Smile(SmileComm, SmileData):
         data = f"<{switch.func_type}><{switch.func}>{state}</{switch.func}></{switch.func_type}>"
 
         if model == "relay":
-            locator = (
-                f'appliance[@id="{appl_id}"]/{switch.actuator}/{switch.func_type}/lock'
-            )
+            locator = f"./{switch.actuator}/{switch.func_type}/lock"
             # Don't bother switching a relay when the corresponding lock-state is true
-            if self._domain_objects.find(locator).text == "true":
+            if appliance.find(locator).text == "true":
                 raise PlugwiseError("Plugwise: the locked Relay was not switched.")
 
         await self._request(uri, method="put", data=data)
+        await self._confirm_write(
+            {appl_id: {"switches": {model: state in ("on", "true")}}},
+            [("appliance", appl_id)],
+        )
 
     async def set_regulation_mode(self, mode: str) -> None:
         """Set the heating regulation mode."""
+        self._check_updated()
         if mode not in self._reg_allowed_modes:
             raise PlugwiseError("Plugwise: invalid regulation mode.")
 
@@ -716,11 +1254,23 @@ class Smile(SmileComm, SmileData):
         if "bleeding" in mode:
             duration = "<duration>300</duration>"
         data = f"<regulation_mode_control_functionality>{duration}<mode>{mode}</mode></regulation_mode_control_functionality>"
+        async with self._update_lock:
+            thermostats = [
+                dev_id
+                for dev_id, device in self.gw_devices.items()
+                if device["dev_class"] in ZONE_THERMOSTATS
+            ]
 
         await self._request(uri, method="put", data=data)
+        await self._confirm_write(
+            {self.gateway_id: {"select_regulation_mode": mode}},
+            [("appliance", self.gateway_id)],
+            thermostats,
+        )
 
     async def set_dhw_mode(self, mode: str) -> None:
         """Set the domestic hot water heating regulation mode."""
+        self._check_updated()
         if mode not in self._dhw_allowed_modes:
             raise PlugwiseError("Plugwise: invalid dhw mode.")
 
@@ -728,7 +1278,21 @@ class Smile(SmileComm, SmileData):
         data = f"<domestic_hot_water_mode_control_functionality><mode>{mode}</mode></domestic_hot_water_mode_control_functionality>"
 
         await self._request(uri, method="put", data=data)
+        await self._confirm_write(
+            {self._heater_id: {"select_dhw_mode": mode}},
+            [("appliance", self._heater_id)],
+        )
 
     async def delete_notification(self) -> None:
         """Delete the active Plugwise Notification."""
+        self._check_updated()
         await self._request(NOTIFICATIONS, method="delete")
+
+        def _clear_notifications() -> None:
+            self._notifications = {}
+            self.gw_data["notifications"] = self._notifications
+
+        await self._confirm_write(
+            {self.gateway_id: {"binary_sensors": {"plugwise_notification": False}}},
+            patch_data=_clear_notifications,
+        )
@@ -0,0 +1,92 @@
+"""Use of this source code is governed by the MIT license found in the LICENSE file.
+
+Plugwise discovery cache: keep the discovery results on disk, for a warm start.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any
+
+from .constants import DISCOVERY_CACHE_VERSION, LOGGER
+
+
+def _read_file(path: str) -> Any:
+    """Read the JSON-data of the cache-file."""
+    with open(path, encoding="utf-8") as cache_file:
+        return json.load(cache_file)
+
+
+def _write_file(path: str, content: str) -> None:
+    """Replace the cache-file, via a temporary file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as cache_file:
+        cache_file.write(content)
+    os.replace(temp_path, path)
+
+
+class DiscoveryCache:
+    """Keep the detection- and discovery-results of the Smiles in a JSON-file.
+
+    The entries are keyed by the MAC-address and firmware-version of the gateway and are found
+    via the endpoint of the Smile. One cache can be shared by many Smiles, e.g. of a SmileFleet.
+    The file is read and written in the default executor of the event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Set the constructor for this class."""
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._path = path
+        self._save_lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Read the cache-file, once, an unreadable or outdated file is ignored."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            self._loaded = True
+            loop = asyncio.get_running_loop()
+            try:
+                content = await loop.run_in_executor(None, _read_file, self._path)
+            except (OSError, ValueError) as err:
+                LOGGER.debug("Plugwise discovery cache not used: %r", err)
+                return
+
+            if (
+                isinstance(content, dict)
+                and content.get("version") == DISCOVERY_CACHE_VERSION
+            ):
+                self._entries = content["gateways"]
+
+    async def async_save(self) -> None:
+        """Write the entries to the cache-file."""
+        content = json.dumps(
+            {"version": DISCOVERY_CACHE_VERSION, "gateways": self._entries}
+        )
+        async with self._save_lock:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, _write_file, self._path, content)
+            except OSError as err:
+                LOGGER.warning("Plugwise discovery cache not saved: %r", err)
+
+    def lookup(self, endpoint: str) -> dict[str, Any] | None:
+        """Return the entry of the Smile at the endpoint, None when not cached."""
+        for entry in self._entries.values():
+            if entry["endpoint"] == endpoint:
+                return entry
+        return None
+
+    def store(self, entry: dict[str, Any]) -> None:
+        """Add or replace the entry of a gateway, replacing its outdated entries."""
+        self._entries = {
+            key: value
+            for key, value in self._entries.items()
+            if value["endpoint"] != entry["endpoint"]
+            and value["mac_address"] != entry["mac_address"]
+        }
+        self._entries[f"{entry['mac_address']}/{entry['firmware_version']}"] = entry
@@ -0,0 +1,96 @@
+"""Use of this source code is governed by the MIT license found in the LICENSE file.
+
+Plugwise compact device data: slotted records sharing their key-layout.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+import sys
+from typing import Any, cast
+
+from .constants import DeviceData
+
+# The key-layouts by key-tuple, shared by all records with the same keys
+_LAYOUTS: dict[tuple[str, ...], dict[str, int]] = {}
+
+
+def _layout(keys: tuple[str, ...]) -> dict[str, int]:
+    """Return the shared layout, the position per key, of the keys."""
+    if (layout := _LAYOUTS.get(keys)) is None:
+        layout = {sys.intern(key): pos for pos, key in enumerate(keys)}
+        _LAYOUTS[keys] = layout
+    return layout
+
+
+class _CompactMapping(Mapping[str, Any]):
+    """A read-only mapping of values, the compact form of a dict.
+
+    The key names are interned and the key-layout is shared by all mappings with the same keys,
+    per mapping only the values are kept, in a tuple. Nested dicts are kept as CompactRecords.
+    """
+
+    __slots__ = ("_layout", "_values")
+
+    def __init__(self, data: Mapping[str, Any]) -> None:
+        """Set the constructor for this class."""
+        self._layout = _layout(tuple(data))
+        self._values = tuple(
+            CompactRecord(value) if isinstance(value, dict) else value
+            for value in data.values()
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        """Return the value of the key."""
+        return self._values[self._layout[key]]
+
+    def __contains__(self, key: object) -> bool:
+        """Return whether the key is present."""
+        return key in self._layout
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the keys, in the order of the dict."""
+        return iter(self._layout)
+
+    def __len__(self) -> int:
+        """Return the number of keys."""
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        """Return the representation of the record."""
+        return f"{type(self).__name__}({self._export()!r})"
+
+    def _export(self) -> dict[str, Any]:
+        """Return the values as a new dict, the nested records and lists included."""
+        result: dict[str, Any] = {}
+        for key, value in zip(self._layout, self._values):
+            if isinstance(value, CompactRecord):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = list(value)
+            result[key] = value
+        return result
+
+
+class CompactRecord(_CompactMapping):
+    """The compact form of a nested dict, e.g. the sensors of a device."""
+
+    __slots__ = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the record as a new dict."""
+        return self._export()
+
+
+class CompactDevice(_CompactMapping):
+    """The compact form of the DeviceData of a device."""
+
+    __slots__ = ()
+
+    def to_dict(self) -> DeviceData:
+        """Return the DeviceData of the device, in the shape and order of the original."""
+        return cast(DeviceData, self._export())
+
+
+def compact_devices(devices: Mapping[str, DeviceData]) -> dict[str, CompactDevice]:
+    """Return the compact form of the devices, e.g. PlugwiseData.devices."""
+    return {dev_id: CompactDevice(device) for dev_id, device in devices.items()}
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from collections import namedtuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
 from typing import Final, Literal, TypedDict, get_args
 
@@ -31,6 +31,13 @@ VOLUME_CUBIC_METERS_PER_HOUR: Final = "m³/h"
 
 ADAM: Final = "Adam"
 ANNA: Final = "Smile Anna"
+DEFAULT_FAST_REFRESH: Final = 2.0
+DEFAULT_INTERVAL: Final = 60.0
+DEFAULT_JITTER: Final = 0.1
+DEFAULT_MAX_CONCURRENT: Final = 10
+DEFAULT_MAX_INTERVAL: Final = 300.0
+DEFAULT_MAX_PER_HOST: Final = 1
+DEFAULT_MIN_INTERVAL: Final = 5.0
 DEFAULT_TIMEOUT: Final = 30
 DEFAULT_USERNAME: Final = "smile"
 DEFAULT_PORT: Final = 80
@@ -77,9 +84,21 @@ HW_MODELS: Final[dict[str, str]] = {
     "080029": "Switch",
 }
 
+# DOMAIN_OBJECTS data not used by the helpers, discarded while parsing
+DISCARDED_ELEMENTS: Final[tuple[str, ...]] = ("neighbors",)
+DISCARDED_OBJECTS: Final[tuple[str, ...]] = (
+    "ame_regulation",
+    "open_therm_regulation",
+    "template",
+)
+
+# Increase when the content of the discovery cache changes
+DISCOVERY_CACHE_VERSION: Final = 1
+MAX_GROUP_REQUESTS: Final = 4
 MAX_SETPOINT: Final[float] = 30.0
 MIN_SETPOINT: Final[float] = 4.0
 NONE: Final = "None"
+READ_CHUNK_SIZE: Final = 16384
 
 # XML data paths
 APPLIANCES: Final = "/core/appliances"
@@ -259,6 +278,7 @@ SelectOptionsType = Literal[
 ]
 
 SensorType = Literal[
+    "average_valve_position",
     "battery",
     "cooling_activation_outdoor_temperature",
     "cooling_deactivation_threshold",
@@ -294,6 +314,7 @@ SensorType = Literal[
     "humidity",
     "illuminance",
     "intended_boiler_temperature",
+    "maximum_valve_position",
     "modulation_level",
     "net_electricity_cumulative",
     "net_electricity_point",
@@ -320,6 +341,11 @@ SPECIAL_PLUG_TYPES: Final[tuple[str, ...]] = (
 )
 
 SPECIAL_FORMAT: Final[tuple[str, ...]] = (ENERGY_KILO_WATT_HOUR, VOLUME_CUBIC_METERS)
+# The number of decimals per unit, the values of the other units are rounded by magnitude
+UNIT_DECIMALS: Final[dict[str, int]] = {
+    **dict.fromkeys(SPECIAL_FORMAT, 3),
+    ELECTRIC_POTENTIAL_VOLT: 1,
+}
 
 SwitchType = Literal[
     "cooling_ena_switch",
@@ -331,6 +357,8 @@ SWITCHES: Final[tuple[str, ...]] = get_args(SwitchType)
 
 SWITCH_GROUP_TYPES: Final[tuple[str, ...]] = ("switching", "report")
 
+PLATFORM_DICTS: Final[tuple[str, ...]] = ("binary_sensors", "sensors", "switches")
+
 THERMOSTAT_CLASSES: Final[tuple[str, ...]] = (
     "thermostat",
     "thermo_sensor",
@@ -395,6 +423,7 @@ class SmileBinarySensors(TypedDict, total=False):
 class SmileSensors(TypedDict, total=False):
     """Smile Sensors class."""
 
+    average_valve_position: float
     battery: float
     cooling_activation_outdoor_temperature: float
     cooling_deactivation_threshold: float
@@ -430,6 +459,7 @@ class SmileSensors(TypedDict, total=False):
     humidity: float
     illuminance: float
     intended_boiler_temperature: float
+    maximum_valve_position: float
     modulation_level: float
     net_electricity_cumulative: float
     net_electricity_point: int
@@ -532,9 +562,68 @@ class DeviceData(TypedDict, total=False):
     thermostat: ActuatorData
 
 
+class DeviceChanges(TypedDict, total=False):
+    """The items of a device that changed since the previous update."""
+
+    attributes: set[str]
+    binary_sensors: set[str]
+    sensors: set[str]
+    switches: set[str]
+
+
+@dataclass(slots=True)
+class ApplianceInfo:
+    """The info of an appliance, collected while discovering the devices."""
+
+    dev_id: str
+    pwclass: str
+    location: str | None = None
+    name: str | None = None
+    model: str | None = None
+    firmware: str | None = None
+    hardware: str | None = None
+    mac: str | None = None
+    zigbee_mac: str | None = None
+    vendor_name: str | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class PowerLocator:
+    """The locator of a P1 power-data value and its output-names."""
+
+    log_type: str
+    measurement: str
+    tariff: str
+    fallback: bool
+    key_string: str
+    net_string: str
+    attrs: UOM
+
+
+@dataclass(slots=True)
+class SwitchSpec:
+    """The XML-elements addressing a switch of an appliance."""
+
+    actuator: str = "actuator_functionalities"
+    device: str = "relay"
+    func_type: str = "relay_functionality"
+    func: str = "state"
+    act_type: str | None = None
+
+
+@dataclass
+class PlugwiseChanges:
+    """Plugwise data changed since the previous update, provided as output."""
+
+    gateway: set[str] = field(default_factory=set)
+    devices: dict[str, DeviceChanges] = field(default_factory=dict)
+    removed_devices: set[str] = field(default_factory=set)
+
+
 @dataclass
 class PlugwiseData:
     """Plugwise data provided as output."""
 
     gateway: GatewayData
     devices: dict[str, DeviceData]
+    changes: PlugwiseChanges = field(default_factory=PlugwiseChanges)
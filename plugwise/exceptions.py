@@ -47,3 +47,15 @@ class InvalidXMLError(PlugwiseException):
 
 class XMLDataMissingError(PlugwiseException):
     """Raised when xml data is empty."""
+
+
+class SwitchGroupError(ErrorSendingCommandError):
+    """Raised when switching one or more members of a switch-group failed.
+
+    The errors-attribute holds the error per failed member.
+    """
+
+    def __init__(self, errors: dict[str, PlugwiseException]) -> None:
+        """Set the constructor for this class."""
+        super().__init__(f"Plugwise: switching the members {', '.join(errors)} failed.")
+        self.errors = errors
@@ -0,0 +1,273 @@
+"""Use of this source code is governed by the MIT license found in the LICENSE file.
+
+Plugwise fleet: poll many Smiles from a single process.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+import contextlib
+from dataclasses import dataclass
+import functools
+import random
+from typing import Any
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from . import Smile
+from .constants import (
+    DEFAULT_FAST_REFRESH,
+    DEFAULT_INTERVAL,
+    DEFAULT_JITTER,
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MAX_PER_HOST,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_PORT,
+    DEFAULT_TIMEOUT,
+    DEFAULT_USERNAME,
+    LOGGER,
+    PlugwiseData,
+)
+from .exceptions import PlugwiseError, PlugwiseException
+from .scheduler import AdaptiveScheduler
+
+
+@dataclass
+class FleetResult:
+    """The result of polling one gateway of the fleet.
+
+    The error is a PlugwiseException, or the ClientError or TimeoutError
+    raised while receiving the data.
+    """
+
+    name: str
+    data: PlugwiseData | None = None
+    error: Exception | None = None
+
+
+class Gateway:
+    """A Smile of the fleet, with its polling schedule."""
+
+    def __init__(
+        self,
+        name: str,
+        host: str,
+        smile: Smile,
+        interval: float,
+        scheduler: AdaptiveScheduler | None,
+    ) -> None:
+        """Set the constructor for this class."""
+        self.connected = False
+        self.host = host
+        self.interval = interval
+        self.name = name
+        self.next_poll = 0.0
+        self.remove_listener: Callable[[], None] | None = None
+        self.scheduler = scheduler
+        self.smile = smile
+        self.task: asyncio.Task[None] | None = None
+        self.wake = asyncio.Event()
+
+
+class SmileFleet:
+    """Poll many Smiles concurrently, sharing one pooled ClientSession.
+
+    The number of concurrent polls is limited globally and per host, each gateway is polled
+    on its own schedule, the interval is varied randomly by the jitter-fraction to spread the load.
+    With adaptive=True the interval of each gateway follows the change rate of its data,
+    within min_interval and max_interval. After a setter-call the gateway is polled again
+    after fast_refresh seconds, the fast_refresh of its scheduler when adaptive.
+    Create the fleet, and add the gateways, from within the running event loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        jitter: float = DEFAULT_JITTER,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+        websession: ClientSession | None = None,
+        adaptive: bool = False,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        fast_refresh: float = DEFAULT_FAST_REFRESH,
+    ) -> None:
+        """Set the constructor for this class."""
+        self._own_session = websession is None
+        if websession is None:
+            websession = ClientSession(
+                connector=TCPConnector(
+                    limit=max_concurrent, limit_per_host=max_per_host
+                ),
+                timeout=ClientTimeout(total=timeout),
+            )
+
+        self._adaptive = adaptive
+        self._fast_refresh = fast_refresh
+        self._gateways: dict[str, Gateway] = {}
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._interval = interval
+        self._jitter = jitter
+        self._limit = asyncio.Semaphore(max_concurrent)
+        self._max_interval = max_interval
+        self._max_per_host = max_per_host
+        self._min_interval = min_interval
+        self._results: asyncio.Queue[FleetResult] | None = None
+        self._timeout = timeout
+        self._websession = websession
+
+    @property
+    def gateways(self) -> dict[str, Smile]:
+        """Return the Smiles of the fleet, by name."""
+        return {name: gateway.smile for name, gateway in self._gateways.items()}
+
+    def add(
+        self,
+        host: str,
+        password: str,
+        username: str = DEFAULT_USERNAME,
+        port: int = DEFAULT_PORT,
+        name: str | None = None,
+        interval: float | None = None,
+        **kwargs: Any,
+    ) -> Smile:
+        """Add a gateway to the fleet, return its Smile.
+
+        The name defaults to the host, the interval to the interval of the fleet.
+        The kwargs are passed to the Smile.
+        """
+        name = name or host
+        if name in self._gateways:
+            raise PlugwiseError(f"Plugwise: gateway {name} already in the fleet.")
+
+        smile = Smile(
+            host,
+            password,
+            username=username,
+            port=port,
+            timeout=self._timeout,
+            websession=self._websession,
+            **kwargs,
+        )
+        interval = interval or self._interval
+        scheduler: AdaptiveScheduler | None = None
+        if self._adaptive:
+            scheduler = AdaptiveScheduler(
+                interval, self._min_interval, self._max_interval, self._fast_refresh
+            )
+        gateway = Gateway(name, host, smile, interval, scheduler)
+        gateway.remove_listener = smile.add_write_listener(
+            functools.partial(self._written, gateway)
+        )
+        self._gateways[name] = gateway
+        if self._results is not None:
+            self._start(gateway)
+
+        return smile
+
+    def remove(self, name: str) -> None:
+        """Remove a gateway from the fleet."""
+        gateway = self._gateways.pop(name)
+        if gateway.remove_listener is not None:
+            gateway.remove_listener()
+        if gateway.task is not None:
+            gateway.task.cancel()
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        """Return the semaphore limiting the concurrent polls of a host."""
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self._max_per_host)
+        return self._host_limits[host]
+
+    def _next_interval(self, gateway: Gateway, result: FleetResult) -> float:
+        """Return the time until the next poll of the gateway."""
+        interval = gateway.interval
+        if gateway.scheduler is not None:
+            interval = gateway.scheduler.interval
+            if result.data is not None:
+                interval = gateway.scheduler.update(result.data.changes)
+        return interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+
+    def _written(self, gateway: Gateway, command: str) -> None:
+        """Poll the gateway again shortly after a write."""
+        if gateway.task is None:
+            return
+
+        fast_refresh = self._fast_refresh
+        if gateway.scheduler is not None:
+            fast_refresh = gateway.scheduler.fast_refresh
+        next_poll = asyncio.get_running_loop().time() + fast_refresh
+        if next_poll < gateway.next_poll:
+            gateway.next_poll = next_poll
+            gateway.wake.set()
+
+    async def _poll(self, gateway: Gateway) -> FleetResult:
+        """Connect the gateway, when not connected, and update its data."""
+        async with self._limit, self._host_limit(gateway.host):
+            try:
+                if not gateway.connected:
+                    gateway.connected = await gateway.smile.connect()
+                data = await gateway.smile.async_update()
+            except (PlugwiseException, ClientError, asyncio.TimeoutError) as err:
+                LOGGER.warning("Polling gateway %s failed: %r", gateway.name, err)
+                return FleetResult(gateway.name, error=err)
+
+        return FleetResult(gateway.name, data=data)
+
+    async def _run(self, gateway: Gateway) -> None:
+        """Poll the gateway on its schedule, queue the results."""
+        loop = asyncio.get_running_loop()
+        # Spread the first polls of the gateways
+        gateway.next_poll = loop.time() + random.uniform(
+            0, gateway.interval * self._jitter
+        )
+        while True:
+            if (delay := gateway.next_poll - loop.time()) > 0:
+                gateway.wake.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(gateway.wake.wait(), delay)
+                continue
+
+            result = await self._poll(gateway)
+            gateway.next_poll = loop.time() + self._next_interval(gateway, result)
+            if self._results is not None:
+                await self._results.put(result)
+
+    def _start(self, gateway: Gateway) -> None:
+        """Start the polling task of the gateway."""
+        gateway.task = asyncio.create_task(self._run(gateway))
+
+    async def poll_once(self) -> AsyncIterator[FleetResult]:
+        """Poll all gateways once, yield the results as they arrive."""
+        polls = [self._poll(gateway) for gateway in self._gateways.values()]
+        for poll in asyncio.as_completed(polls):
+            yield await poll
+
+    async def poll(self) -> AsyncIterator[FleetResult]:
+        """Poll all gateways on their schedules, yield the results as they arrive.
+
+        Polling stops when the iteration of the results stops.
+        """
+        self._results = asyncio.Queue()
+        for gateway in self._gateways.values():
+            self._start(gateway)
+        try:
+            while True:
+                yield await self._results.get()
+        finally:
+            self._results = None
+            for gateway in self._gateways.values():
+                if gateway.task is not None:
+                    gateway.task.cancel()
+                    gateway.task = None
+
+    async def close(self) -> None:
+        """Stop polling, close the session when owned by the fleet."""
+        for gateway in self._gateways.values():
+            if gateway.task is not None:
+                gateway.task.cancel()
+                gateway.task = None
+        if self._own_session:
+            await self._websession.close()
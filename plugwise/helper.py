@@ -5,19 +5,14 @@ Plugwise Smile protocol helpers.
 from __future__ import annotations
 
 import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
 import datetime as dt
-from typing import cast
-
-# This way of importing aiohttp is because of patch/mocking in testing (aiohttp timeouts)
-from aiohttp import BasicAuth, ClientError, ClientResponse, ClientSession, ClientTimeout
-
-# Time related
-from dateutil import tz
-from dateutil.parser import parse
-from defusedxml import ElementTree as etree
-from munch import Munch
-import semver
+import re
+import time
+from typing import TYPE_CHECKING, Final, cast
 
+from .compact import CompactDevice
 from .constants import (
     ACTIVE_ACTUATORS,
     ACTUATOR_CLASSES,
@@ -29,6 +24,8 @@ from .constants import (
     DATA,
     DEVICE_MEASUREMENTS,
     DHW_SETPOINT,
+    DISCARDED_ELEMENTS,
+    DISCARDED_OBJECTS,
     ENERGY_KILO_WATT_HOUR,
     ENERGY_WATT_HOUR,
     HEATER_CENTRAL_MEASUREMENTS,
@@ -38,7 +35,9 @@ from .constants import (
     NONE,
     OBSOLETE_MEASUREMENTS,
     P1_MEASUREMENTS,
+    PERCENTAGE,
     POWER_WATT,
+    READ_CHUNK_SIZE,
     SENSORS,
     SPECIAL_PLUG_TYPES,
     SWITCH_GROUP_TYPES,
@@ -50,11 +49,13 @@ from .constants import (
     ActuatorData,
     ActuatorDataType,
     ActuatorType,
+    ApplianceInfo,
     ApplianceType,
     BinarySensorType,
     DeviceData,
     GatewayData,
     ModelData,
+    PowerLocator,
     SensorType,
     SwitchType,
     ThermoLoc,
@@ -66,7 +67,16 @@ from .exceptions import (
     InvalidXMLError,
     ResponseError,
 )
-from .util import escape_illegal_xml_characters, format_measure, version_to_model
+from .metrics import Metrics, MetricsListener, RequestMetrics
+from .util import escape_illegal_xml_bytes, format_measure, version_to_model
+
+# The heavy modules are imported on first use, keeping "import plugwise" fast
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from aiohttp import ClientResponse, ClientSession
+    from defusedxml import ElementTree as etree
+    import semver
 
 
 def check_model(name: str | None, vendor_name: str | None) -> str | None:
@@ -77,6 +87,78 @@ def check_model(name: str | None, vendor_name: str | None) -> str | None:
     return name
 
 
+def measurement_plan(
+    measurements: dict[str, DATA | UOM]
+) -> dict[str, tuple[str, str, str | None]]:
+    """Derive the output-name, unit and kind of data per measurement-type.
+
+    The kind is the output data the measurement is collected in.
+    """
+    plan: dict[str, tuple[str, str, str | None]] = {}
+    for measurement, attrs in measurements.items():
+        name = getattr(attrs, ATTR_NAME, None) or measurement
+        kind: str | None = None
+        if name in ("c_heating_state", "elga_status_code", "select_dhw_mode"):
+            kind = name
+        elif name in BINARY_SENSORS:
+            kind = "binary_sensors"
+        elif name in SENSORS:
+            kind = "sensors"
+        elif name in SWITCHES:
+            kind = "switches"
+        plan[measurement] = (name, getattr(attrs, ATTR_UNIT_OF_MEASUREMENT), kind)
+
+    return plan
+
+
+DEVICE_MEASUREMENT_PLAN: Final = measurement_plan(DEVICE_MEASUREMENTS)
+HEATER_CENTRAL_MEASUREMENT_PLAN: Final = measurement_plan(HEATER_CENTRAL_MEASUREMENTS)
+
+
+ANY_TARIFF: Final = "*"
+
+
+def p1_measurement_plan() -> tuple[PowerLocator, ...]:
+    """Derive the P1 power-data locators and output-names from P1_MEASUREMENTS.
+
+    The order of the plan is the order of collecting the net_electricity values.
+    """
+    plan: list[PowerLocator] = []
+    for measurement, attrs in P1_MEASUREMENTS.items():
+        for log_type in ("point_log", "cumulative_log", "interval_log"):
+            for tariff in ("nl_peak", "nl_offpeak"):
+                # Gas and phase data are (mostly) provided without a tariff,
+                # use the first found, once
+                fallback = "gas" in measurement or "phase" in measurement
+                if fallback and tariff == "nl_offpeak":
+                    fallback = False
+
+                peak = "off_peak" if tariff == "nl_offpeak" else "peak"
+                log_found = log_type.split("_")[0]
+                key_string = f"{measurement}_{peak}_{log_found}"
+                if "gas" in measurement:
+                    key_string = f"{measurement}_{log_found}"
+                if "phase" in measurement:
+                    key_string = f"{measurement}"
+                net_string = f"net_electricity_{log_found}"
+                plan.append(
+                    PowerLocator(
+                        log_type,
+                        measurement,
+                        tariff,
+                        fallback,
+                        key_string,
+                        net_string,
+                        attrs,
+                    )
+                )
+
+    return tuple(plan)
+
+
+P1_MEASUREMENT_PLAN: Final = p1_measurement_plan()
+
+
 def power_data_local_format(
     attrs: dict[str, str], key_string: str, val: str
 ) -> float | int:
@@ -90,6 +172,112 @@ def power_data_local_format(
     return format_measure(val, attrs_uom)
 
 
+class PruningTreeBuilder:
+    """Build the XML-tree, without the DISCARDED_OBJECTS and DISCARDED_ELEMENTS."""
+
+    def __init__(self) -> None:
+        """Set the constructor for this class."""
+        from xml.etree.ElementTree import (  # pylint: disable=import-outside-toplevel
+            TreeBuilder,
+        )
+
+        self._builder = TreeBuilder()
+        self._depth = 0
+        self._skip = 0
+
+    def start(self, tag: str, attrs: dict[str, str]) -> None:
+        """Handle an opening tag."""
+        self._depth += 1
+        if self._skip or tag in DISCARDED_ELEMENTS:
+            self._skip += 1
+        elif self._depth == 2 and tag in DISCARDED_OBJECTS:
+            self._skip += 1
+        else:
+            self._builder.start(tag, attrs)
+
+    def end(self, tag: str) -> None:
+        """Handle a closing tag."""
+        self._depth -= 1
+        if self._skip:
+            self._skip -= 1
+        else:
+            self._builder.end(tag)
+
+    def data(self, data: str) -> None:
+        """Handle text data."""
+        if not self._skip:
+            self._builder.data(data)
+
+    def close(self) -> etree:
+        """Return the root element of the XML-tree."""
+        return self._builder.close()
+
+
+def parse_xml(xmldata: bytes) -> etree:
+    """Parse complete XML-data, discarding the data not used.
+
+    A module-level function, so it can also be run in a process pool.
+    """
+    from defusedxml.ElementTree import (  # pylint: disable=import-outside-toplevel
+        DefusedXMLParser,
+    )
+
+    parser = DefusedXMLParser(target=PruningTreeBuilder())
+    parser.feed(escape_illegal_xml_bytes(xmldata))
+    return parser.close()
+
+
+class CommandQueue:
+    """Send the writes to a Smile one at a time, in the order of submission.
+
+    A write still waiting at the end of the queue is superseded by a newer write
+    to the same target, the method, URI and written elements: only the newest data is sent,
+    the callers of both writes receive the result of that request.
+    """
+
+    def __init__(
+        self, send: Callable[[str, str, str | None], Awaitable[etree]]
+    ) -> None:
+        """Set the constructor for this class."""
+        self._pending: deque[
+            tuple[tuple[str, str, str], str | None, list[asyncio.Future[etree]]]
+        ] = deque()
+        self._send = send
+        self._worker: asyncio.Task[None] | None = None
+
+    async def submit(self, command: str, method: str, data: str | None) -> etree:
+        """Queue a write, return its result when sent."""
+        future: asyncio.Future[etree] = asyncio.get_running_loop().create_future()
+        # The written elements without their values, e.g. a relay-lock or a relay-state
+        elements = re.sub(r">[^<]*<", "><", data or "")
+        target = (method, command, elements)
+        futures = [future]
+        if self._pending and self._pending[-1][0] == target:
+            LOGGER.debug("Superseding the queued %s %s", method, command)
+            futures = self._pending.pop()[2] + futures
+        self._pending.append((target, data, futures))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+        return await future
+
+    async def _run(self) -> None:
+        """Send the queued writes."""
+        while self._pending:
+            target, data, futures = self._pending.popleft()
+            method, command, _ = target
+            try:
+                result = await self._send(command, method, data)
+            except Exception as err:  # pylint: disable=broad-except
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(err)
+            else:
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+
+
 class SmileComm:
     """The SmileComm class."""
 
@@ -101,8 +289,17 @@ class SmileComm:
         port: int,
         timeout: float,
         websession: ClientSession | None,
+        offload: bool = False,
+        executor: Executor | None = None,
+        command_queue: bool = False,
     ) -> None:
         """Set the constructor for this class."""
+        from aiohttp import (  # pylint: disable=import-outside-toplevel
+            BasicAuth,
+            ClientSession,
+            ClientTimeout,
+        )
+
         if not websession:
             aio_timeout = ClientTimeout(total=timeout)
 
@@ -124,13 +321,75 @@ class SmileComm:
             host = f"[{host}]"
 
         self._auth = BasicAuth(username, password=password)
+        self._commands: CommandQueue | None = None
+        if command_queue:
+            self._commands = CommandQueue(self._send_command)
         self._endpoint = f"http://{host}:{str(port)}"
+        self._etags: dict[str, str] = {}
+        self._executor = executor
+        self._last_modified: dict[str, str] = {}
+        self._offload = offload
         self._timeout = timeout
+        self._metrics_listeners: list[MetricsListener] = []
+        self._write_listeners: list[Callable[[str], None]] = []
 
-    async def _request_validate(self, resp: ClientResponse, method: str) -> etree:
+    def add_write_listener(self, listener: Callable[[str], None]) -> Callable[[], None]:
+        """Add a listener called with the command after each write (put/delete).
+
+        Return the function removing the listener.
+        """
+        self._write_listeners.append(listener)
+        return lambda: self._write_listeners.remove(listener)
+
+    def add_metrics_listener(self, listener: MetricsListener) -> Callable[[], None]:
+        """Add a listener called with the metrics of each request and update.
+
+        Return the function removing the listener.
+        """
+        self._metrics_listeners.append(listener)
+        return lambda: self._metrics_listeners.remove(listener)
+
+    def _emit_metrics(self, metrics: Metrics) -> None:
+        """Provide the metrics to the listeners."""
+        for listener in self._metrics_listeners:
+            listener(metrics)
+
+    async def _send_command(self, command: str, method: str, data: str | None) -> etree:
+        """Helper-function for the CommandQueue: send a queued write."""
+        return await self._request(command, method=method, data=data, queued=True)
+
+    def _conditional_headers(
+        self, command: str, headers: dict[str, str] | None
+    ) -> dict[str, str]:
+        """Helper-function for _request().
+
+        Add the validators of the previous response to the request headers.
+        """
+        cond_headers = dict(headers) if headers else {}
+        if (etag := self._etags.get(command)) is not None:
+            cond_headers["If-None-Match"] = etag
+        if (last_modified := self._last_modified.get(command)) is not None:
+            cond_headers["If-Modified-Since"] = last_modified
+
+        return cond_headers
+
+    def _store_validators(self, command: str, resp: ClientResponse) -> None:
+        """Helper-function for _request().
+
+        Store the ETag and Last-Modified headers of a full response.
+        """
+        if (etag := resp.headers.get("ETag")) is not None:
+            self._etags[command] = etag
+        if (last_modified := resp.headers.get("Last-Modified")) is not None:
+            self._last_modified[command] = last_modified
+
+    async def _request_validate(
+        self, resp: ClientResponse, method: str, metrics: RequestMetrics
+    ) -> etree:
         """Helper-function for _request(): validate the returned data."""
-        # Command accepted gives empty body with status 202
-        if resp.status == 202:
+        # Command accepted gives empty body with status 202,
+        # not modified since the previous conditional request gives status 304
+        if resp.status in (202, 304):
             return
 
         if resp.status == 401:
@@ -138,19 +397,85 @@ class SmileComm:
             LOGGER.error("%s", msg)
             raise InvalidAuthentication
 
-        if not (result := await resp.text()) or "<error>" in result:
-            LOGGER.warning("Smile response empty or error in %s", result)
+        if self._offload:
+            return await self._parse_offloaded(resp, metrics)
+
+        from defusedxml.ElementTree import (  # pylint: disable=import-outside-toplevel
+            DefusedXMLParser,
+            ParseError,
+        )
+
+        # Parse the XML-data while it is received
+        start = time.perf_counter()
+        parser = DefusedXMLParser(target=PruningTreeBuilder())
+        parse_error = False
+        error_found = False
+        size = 0
+        tail = pending = b""
+        async for chunk in resp.content.iter_chunked(READ_CHUNK_SIZE):
+            size += len(chunk)
+            error_found = error_found or b"<error>" in tail + chunk
+            tail = chunk[-6:]
+            if parse_error:
+                continue
+
+            # Hold back trailing &-characters, these can only be escaped
+            # together with the next chunk
+            chunk = pending + chunk
+            stripped = chunk.rstrip(b"&")
+            chunk, pending = stripped, chunk[len(stripped) :]
+            try:
+                parser.feed(escape_illegal_xml_bytes(chunk))
+            except ParseError:
+                parse_error = True
+
+        metrics.body_time = time.perf_counter() - start
+        metrics.bytes_received = size
+        if not size or error_found:
+            LOGGER.warning("Smile response empty or error in %s", self._endpoint)
             raise ResponseError
 
         try:
-            # Encode to ensure utf8 parsing
-            xml = etree.XML(escape_illegal_xml_characters(result).encode())
-        except etree.ParseError:
+            if parse_error:
+                raise ParseError
+            parser.feed(escape_illegal_xml_bytes(pending))
+            xml = parser.close()
+        except ParseError:
             LOGGER.warning("Smile returns invalid XML for %s", self._endpoint)
             raise InvalidXMLError
 
         return xml
 
+    async def _parse_offloaded(
+        self, resp: ClientResponse, metrics: RequestMetrics
+    ) -> etree:
+        """Helper-function for _request_validate().
+
+        Receive the complete XML-data, then parse it in the executor.
+        """
+        start = time.perf_counter()
+        xmldata = await resp.read()
+        metrics.body_time = time.perf_counter() - start
+        metrics.bytes_received = len(xmldata)
+        if not xmldata or b"<error>" in xmldata:
+            LOGGER.warning("Smile response empty or error in %s", self._endpoint)
+            raise ResponseError
+
+        from defusedxml.ElementTree import (  # pylint: disable=import-outside-toplevel
+            ParseError,
+        )
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            xml = await loop.run_in_executor(self._executor, parse_xml, xmldata)
+        except ParseError:
+            LOGGER.warning("Smile returns invalid XML for %s", self._endpoint)
+            raise InvalidXMLError
+
+        metrics.parse_time = time.perf_counter() - start
+        return xml
+
     async def _request(
         self,
         command: str,
@@ -158,11 +483,26 @@ class SmileComm:
         method: str = "get",
         data: str | None = None,
         headers: dict[str, str] | None = None,
+        conditional: bool = False,
+        queued: bool = False,
     ) -> etree:
-        """Get/put/delete data from a give URL."""
+        """Get/put/delete data from a give URL.
+
+        With conditional=True a get is only answered with data when changed
+        since the previous request, otherwise None is returned.
+        With the command queue, writes are sent via the queue (queued=True).
+        """
+        if method != "get" and self._commands is not None and not queued:
+            return await self._commands.submit(command, method, data)
+
+        from aiohttp import ClientError  # pylint: disable=import-outside-toplevel
+
         resp: ClientResponse
         url = f"{self._endpoint}{command}"
+        if conditional:
+            headers = self._conditional_headers(command, headers)
 
+        start = time.perf_counter()
         try:
             if method == "delete":
                 resp = await self._websession.delete(url, auth=self._auth)
@@ -187,9 +527,24 @@ class SmileComm:
                     err,
                 )
                 raise ConnectionFailedError
-            return await self._request(command, retry - 1)
+            return await self._request(command, retry - 1, conditional=conditional)
+
+        metrics = RequestMetrics(
+            command,
+            method,
+            resp.status,
+            response_time=time.perf_counter() - start,
+            retries=3 - retry,
+        )
+        result = await self._request_validate(resp, method, metrics)
+        if conditional and resp.status == 200:
+            self._store_validators(command, resp)
+        if method != "get":
+            for listener in self._write_listeners:
+                listener(command)
+        self._emit_metrics(metrics)
 
-        return await self._request_validate(resp, method)
+        return result
 
     async def close_connection(self) -> None:
         """Close the Plugwise connection."""
@@ -201,28 +556,46 @@ class SmileHelper:
 
     def __init__(self) -> None:
         """Set the constructor for this class."""
+        self._appliances: dict[str, etree] = {}
         self._cooling_activation_outdoor_temp: float
         self._cooling_deactivation_threshold: float
         self._cooling_present = False
         self._count: int
+        self._device_info: dict[str, CompactDevice] = {}
         self._dhw_allowed_modes: list[str] = []
+        self._discovery_count: int = 0
+        self._domain_notifications: dict[str, etree] = {}
         self._domain_objects: etree
         self._elga = False
+        self._groups: dict[str, etree] = {}
         self._heater_id: str
         self._home_location: str
         self._is_thermostat = False
         self._last_active: dict[str, str | None] = {}
-        self._last_modified: dict[str, str] = {}
         self._loc_data: dict[str, ThermoLoc] = {}
+        self._loc_devices: dict[str, list[str]] = {}
+        self._locations: dict[str, etree] = {}
+        self._module_data: dict[str, ModelData] = {}
+        self._modules: dict[str, etree] = {}
         self._notifications: dict[str, dict[str, str]] = {}
         self._on_off_device = False
+        self._open_valves: int | bool = False
         self._opentherm_device = False
         self._outdoor_temp: float
+        self._preset_data: dict[str, list[float]] | None = None
         self._reg_allowed_modes: list[str] = []
+        self._rule_locations: dict[str, set[str]] = {}
+        self._rule_names: dict[str, list[str]] = {}
+        self._rule_tags: dict[str, list[str]] = {}
+        self._rules: dict[str, etree] = {}
+        self._schedule_names: dict[str, str] = {}
         self._schedule_old_states: dict[str, dict[str, str]] = {}
+        self._services: dict[str, ModelData] = {}
         self._status: etree
         self._system: etree
         self._thermo_locs: dict[str, ThermoLoc] = {}
+        self._topology: frozenset[str] = frozenset()
+        self._valve_positions: list[float | int] = []
         ###################################################################
         # '_cooling_enabled' can refer to the state of the Elga heatpump
         # connected to an Anna. For Elga, 'elga_status_code' in [8, 9]
@@ -257,29 +630,55 @@ class SmileHelper:
         """Helper-function checking the smile-name."""
         return self.smile_name == name
 
-    def _all_locations(self) -> None:
-        """Collect all locations."""
-        loc = Munch()
-
-        locations = self._domain_objects.findall("./location")
-        for location in locations:
-            loc.name = location.find("name").text
-            loc.loc_id = location.attrib["id"]
+    def _index_domain_objects(self) -> None:
+        """Helper-function for smile.py: _update_domain_objects().
 
-            if loc.name == "Home":
-                self._home_location = loc.loc_id
+        Build the id-indexes of the DOMAIN_OBJECTS objects, once per fetch.
+        The services are indexed to the module-info of the module they belong to,
+        the rules are also indexed by template-tag, name and linked locations,
+        and by schedule-name when containing directives.
+        """
+        self._appliances = {}
+        self._domain_notifications = {}
+        self._groups = {}
+        self._locations = {}
+        self._module_data = {}
+        self._modules = {}
+        self._preset_data = None
+        self._rule_locations = {}
+        self._rule_names = {}
+        self._rule_tags = {}
+        self._rules = {}
+        self._schedule_names = {}
+        self._services = {}
+        indexes: dict[str, dict[str, etree]] = {
+            "appliance": self._appliances,
+            "group": self._groups,
+            "location": self._locations,
+            "module": self._modules,
+            "notification": self._domain_notifications,
+            "rule": self._rules,
+        }
+        for item in self._domain_objects:
+            if (index := indexes.get(item.tag)) is None:
+                continue
 
-            self._loc_data[loc.loc_id] = {"name": loc.name}
+            index[item.attrib["id"]] = item
+            if item.tag == "module":
+                module_data = self._module_info(item)
+                self._module_data[item.attrib["id"]] = module_data
+                for service in item.iterfind("./services/*"):
+                    self._services[service.attrib["id"]] = module_data
+            if item.tag == "rule":
+                self._index_rule(item)
 
-    def _get_module_data(
-        self, appliance: etree, locator: str, mod_type: str
-    ) -> ModelData:
-        """Helper-function for _energy_device_info_finder() and _appliance_info_finder().
+    def _module_info(self, module: etree) -> ModelData:
+        """Helper-function for _index_domain_objects().
 
-        Collect requested info from MODULES.
+        Collect the vendor-, version- and ZigBee-info of a module.
         """
         model_data: ModelData = {
-            "contents": False,
+            "contents": True,
             "firmware_version": None,
             "hardware_version": None,
             "reachable": None,
@@ -287,36 +686,109 @@ class SmileHelper:
             "vendor_model": None,
             "zigbee_mac_address": None,
         }
+        if (vendor_name := module.find("vendor_name")) is not None:
+            model_data["vendor_name"] = vendor_name.text
+            if vendor_name.text is not None and "Plugwise" in vendor_name.text:
+                model_data["vendor_name"] = vendor_name.text.split(" ", 1)[0]
+        if (vendor_model := module.find("vendor_model")) is not None:
+            model_data["vendor_model"] = vendor_model.text
+        if (hardware_version := module.find("hardware_version")) is not None:
+            model_data["hardware_version"] = hardware_version.text
+        if (firmware_version := module.find("firmware_version")) is not None:
+            model_data["firmware_version"] = firmware_version.text
+        if zb_node := module.find("./protocols/zig_bee_node"):
+            model_data["zigbee_mac_address"] = zb_node.find("mac_address").text
+            model_data["reachable"] = zb_node.find("reachable").text == "true"
+
+        return model_data
+
+    def _index_rule(self, rule: etree) -> None:
+        """Helper-function for _index_domain_objects().
+
+        Index the rule by template-tag and name, and collect the linked location-ids.
+        A rule with directives is indexed as a schedule, an empty schedule is not shown.
+        """
+        rule_id = rule.attrib["id"]
+        for tag in {item.attrib["tag"] for item in rule.iterfind("./template[@tag]")}:
+            self._rule_tags.setdefault(tag, []).append(rule_id)
+        if (name := rule.find("name")) is not None and name.text is not None:
+            self._rule_names.setdefault(name.text, []).append(rule_id)
+            if (directives := rule.find("directives")) is not None and len(directives):
+                self._schedule_names[rule_id] = name.text
+        self._rule_locations[rule_id] = {
+            location.attrib["id"]
+            for location in rule.iterfind("./contexts/context/zone/location[@id]")
+        }
+
+    def _get_topology(self) -> frozenset[str]:
+        """Helper-function for smile.py: get_all_devices() and async_update().
+
+        Collect the location-, appliance- and group-ids with their names, including the links
+        between them, and the firmware, model and ZigBee-address of the modules:
+        a change requires a new device discovery.
+        """
+        topology: set[str] = set()
+        for loc_id, location in self._locations.items():
+            topology.add(f"{loc_id}={location.findtext('name')}")
+
+        for appl_id, appliance in self._appliances.items():
+            loc_id = ""
+            if (appl_loc := appliance.find("location")) is not None:
+                loc_id = appl_loc.attrib["id"]
+            topology.add(f"{appl_id}@{loc_id}={appliance.findtext('name')}")
+
+        for mod_id, module_data in self._module_data.items():
+            topology.add(
+                f"{mod_id}={module_data['firmware_version']}/{module_data['vendor_model']}"
+                f"/{module_data['zigbee_mac_address']}"
+            )
+
+        for group_id, group in self._groups.items():
+            topology.add(f"{group_id}={group.findtext('name')}")
+            for item in group.findall("appliances/appliance"):
+                topology.add(f"{group_id}:{item.attrib['id']}")
+
+        return frozenset(topology)
+
+    def _all_locations(self) -> None:
+        """Collect all locations."""
+        for loc_id, location in self._locations.items():
+            name = location.find("name").text
+            if name == "Home":
+                self._home_location = loc_id
+
+            self._loc_data[loc_id] = {"name": name}
+
+    def _get_module_data(self, appliance: etree, locator: str) -> ModelData:
+        """Helper-function for _energy_device_info_finder() and _appliance_info_finder().
+
+        Collect requested info from MODULES, via the services-index.
+        """
         if (appl_search := appliance.find(locator)) is not None:
             link_id = appl_search.attrib["id"]
-            loc = f".//services/{mod_type}[@id='{link_id}']...."
-            # Not possible to walrus for some reason...
-            module = self._domain_objects.find(loc)
-            if module is not None:  # pylint: disable=consider-using-assignment-expr
-                model_data["contents"] = True
-                if (vendor_name := module.find("vendor_name").text) is not None:
-                    model_data["vendor_name"] = vendor_name
-                    if "Plugwise" in vendor_name:
-                        model_data["vendor_name"] = vendor_name.split(" ", 1)[0]
-                model_data["vendor_model"] = module.find("vendor_model").text
-                model_data["hardware_version"] = module.find("hardware_version").text
-                model_data["firmware_version"] = module.find("firmware_version").text
-                if zb_node := module.find("./protocols/zig_bee_node"):
-                    model_data["zigbee_mac_address"] = zb_node.find("mac_address").text
-                    model_data["reachable"] = zb_node.find("reachable").text == "true"
+            if (module_data := self._services.get(link_id)) is not None:
+                return module_data
 
-        return model_data
+        return {
+            "contents": False,
+            "firmware_version": None,
+            "hardware_version": None,
+            "reachable": None,
+            "vendor_name": None,
+            "vendor_model": None,
+            "zigbee_mac_address": None,
+        }
 
-    def _energy_device_info_finder(self, appliance: etree, appl: Munch) -> Munch:
+    def _energy_device_info_finder(
+        self, appliance: etree, appl: ApplianceInfo
+    ) -> ApplianceInfo | None:
         """Helper-function for _appliance_info_finder().
 
         Collect energy device info (P1, Plug): firmware, model and vendor name.
         """
         if self.smile_type == "power":
             locator = "./logs/point_log/electricity_point_meter"
-            mod_type = "electricity_point_meter"
-
-            module_data = self._get_module_data(appliance, locator, mod_type)
+            module_data = self._get_module_data(appliance, locator)
             appl.hardware = module_data["hardware_version"]
             appl.model = module_data["vendor_model"]
             appl.vendor_name = module_data["vendor_name"]
@@ -326,8 +798,7 @@ class SmileHelper:
 
         if self.smile(ADAM):
             locator = "./logs/interval_log/electricity_interval_meter"
-            mod_type = "electricity_interval_meter"
-            module_data = self._get_module_data(appliance, locator, mod_type)
+            module_data = self._get_module_data(appliance, locator)
             # Filter appliance without zigbee_mac, it's an orphaned device
             appl.zigbee_mac = module_data["zigbee_mac_address"]
             if appl.zigbee_mac is None:
@@ -342,7 +813,9 @@ class SmileHelper:
 
         return appl  # pragma: no cover
 
-    def _appliance_info_finder(self, appliance: etree, appl: Munch) -> Munch:
+    def _appliance_info_finder(
+        self, appliance: etree, appl: ApplianceInfo
+    ) -> ApplianceInfo | None:
         """Collect device info (Smile, Thermostats, OpenTherm/On-Off): firmware, model and vendor name."""
         # Collect gateway device info
         if appl.pwclass == "gateway":
@@ -376,8 +849,7 @@ class SmileHelper:
         # Collect thermostat device info
         if appl.pwclass in THERMOSTAT_CLASSES:
             locator = "./logs/point_log[type='thermostat']/thermostat"
-            mod_type = "thermostat"
-            module_data = self._get_module_data(appliance, locator, mod_type)
+            module_data = self._get_module_data(appliance, locator)
             appl.vendor_name = module_data["vendor_name"]
             appl.model = check_model(module_data["vendor_model"], appl.vendor_name)
             appl.hardware = module_data["hardware_version"]
@@ -403,8 +875,7 @@ class SmileHelper:
             # Info for OpenTherm device
             appl.name = "OpenTherm"
             locator = "./logs/point_log[type='flame_state']/boiler_state"
-            mod_type = "boiler_state"
-            module_data = self._get_module_data(appliance, locator, mod_type)
+            module_data = self._get_module_data(appliance, locator)
             appl.vendor_name = module_data["vendor_name"]
             appl.hardware = module_data["hardware_version"]
             appl.model = check_model(module_data["vendor_model"], appl.vendor_name)
@@ -431,20 +902,21 @@ class SmileHelper:
 
         return appl
 
-    def _p1_smartmeter_info_finder(self, appl: Munch) -> None:
+    def _p1_smartmeter_info_finder(self) -> None:
         """Collect P1 DSMR Smartmeter info."""
         loc_id = next(iter(self._loc_data.keys()))
-        appl.dev_id = self.gateway_id
-        appl.location = loc_id
-        appl.mac = None
-        appl.model = self.smile_model
-        appl.name = "P1"
-        appl.pwclass = "smartmeter"
-        appl.zigbee_mac = None
-        location = self._domain_objects.find(f'./location[@id="{loc_id}"]')
+        appl = ApplianceInfo(
+            self.gateway_id,
+            "smartmeter",
+            location=loc_id,
+            name="P1",
+            model=self.smile_model,
+        )
+        location = self._locations[loc_id]
         appl = self._energy_device_info_finder(location, appl)
 
         self.gw_devices[appl.dev_id] = {"dev_class": appl.pwclass}
+        self._loc_devices.setdefault(appl.location, []).append(appl.dev_id)
         self._count += 1
 
         for key, value in {
@@ -465,19 +937,24 @@ class SmileHelper:
     def _all_appliances(self) -> None:
         """Collect all appliances with relevant info."""
         self._count = 0
+        self._loc_devices = {}
         self._all_locations()
 
-        for appliance in self._domain_objects.findall("./appliance"):
-            appl = Munch()
-            appl.pwclass = appliance.find("type").text
+        for appliance in self._appliances.values():
+            pwclass = appliance.find("type").text
             # Skip thermostats that have this key, should be an orphaned device (Core #81712)
             if (
-                appl.pwclass == "thermostat"
+                pwclass == "thermostat"
                 and appliance.find("actuator_functionalities/") is None
             ):
                 continue
 
-            appl.location = None
+            appl = ApplianceInfo(
+                appliance.attrib["id"],
+                pwclass,
+                name=appliance.find("name").text,
+                model=pwclass.replace("_", " ").title(),
+            )
             if (appl_loc := appliance.find("location")) is not None:
                 appl.location = appl_loc.attrib["id"]
             # Don't assign the _home_location to thermostat-devices
@@ -485,15 +962,6 @@ class SmileHelper:
             elif appl.pwclass not in THERMOSTAT_CLASSES:
                 appl.location = self._home_location
 
-            appl.dev_id = appliance.attrib["id"]
-            appl.name = appliance.find("name").text
-            appl.model = appl.pwclass.replace("_", " ").title()
-            appl.firmware = None
-            appl.hardware = None
-            appl.mac = None
-            appl.zigbee_mac = None
-            appl.vendor_name = None
-
             # Determine class for this appliance
             # Skip on heater_central when no active device present
             if not (appl := self._appliance_info_finder(appliance, appl)):
@@ -509,6 +977,7 @@ class SmileHelper:
                 continue
 
             self.gw_devices[appl.dev_id] = {"dev_class": appl.pwclass}
+            self._loc_devices.setdefault(appl.location, []).append(appl.dev_id)
             self._count += 1
             for key, value in {
                 "firmware": appl.firmware,
@@ -527,7 +996,7 @@ class SmileHelper:
 
         # For P1 collect the connected SmartMeter info
         if self.smile_type == "power":
-            self._p1_smartmeter_info_finder(appl)
+            self._p1_smartmeter_info_finder()
             # P1: for gateway and smartmeter switch device_id - part 2
             for item in self.gw_devices:
                 if item != self.gateway_id:
@@ -548,16 +1017,15 @@ class SmileHelper:
     def _match_locations(self) -> dict[str, ThermoLoc]:
         """Helper-function for _scan_thermostats().
 
-        Match appliances with locations.
+        Match appliances with locations, via the location-devices index.
         """
         matched_locations: dict[str, ThermoLoc] = {}
         for location_id, location_details in self._loc_data.items():
-            for appliance_details in self.gw_devices.values():
-                if appliance_details["location"] == location_id:
-                    location_details.update(
-                        {"master": None, "master_prio": 0, "slaves": set()}
-                    )
-                    matched_locations[location_id] = location_details
+            if location_id in self._loc_devices:
+                location_details.update(
+                    {"master": None, "master_prio": 0, "slaves": set()}
+                )
+                matched_locations[location_id] = location_details
 
         return matched_locations
 
@@ -568,8 +1036,7 @@ class SmileHelper:
         Represents the heating/cooling demand-state of the local master thermostat.
         Note: heating or cooling can still be active when the setpoint has been reached.
         """
-        locator = f'location[@id="{loc_id}"]'
-        if (location := self._domain_objects.find(locator)) is not None:
+        if (location := self._locations.get(loc_id)) is not None:
             locator = './actuator_functionalities/thermostat_functionality[type="thermostat"]/control_state'
             if (ctrl_state := location.find(locator)) is not None:
                 return str(ctrl_state.text)
@@ -577,18 +1044,24 @@ class SmileHelper:
         return False
 
     def _presets(self, loc_id: str) -> dict[str, list[float]]:
-        """Collect Presets for a Thermostat based on location_id."""
+        """Collect Presets for a Thermostat based on location_id.
+
+        The presets of all preset-rules are combined, the result is the same for
+        every location so it is collected once per fetch.
+        """
+        if self._preset_data is not None:
+            return self._preset_data
+
         presets: dict[str, list[float]] = {}
         tag_1 = "zone_setpoint_and_state_based_on_preset"
         tag_2 = "Thermostat presets"
         if not (rule_ids := self._rule_ids_by_tag(tag_1, loc_id)):
             if not (rule_ids := self._rule_ids_by_name(tag_2, loc_id)):
+                self._preset_data = presets
                 return presets  # pragma: no cover
 
         for rule_id in rule_ids:
-            directives: etree = self._domain_objects.find(
-                f'rule[@id="{rule_id}"]/directives'
-            )
+            directives: etree = self._rules[rule_id].find("directives")
             for directive in directives:
                 preset = directive.find("then").attrib
                 presets[directive.attrib["preset"]] = [
@@ -596,6 +1069,7 @@ class SmileHelper:
                     float(preset["cooling_setpoint"]),
                 ]
 
+        self._preset_data = presets
         return presets
 
     def _rule_ids_by_name(self, name: str, loc_id: str) -> dict[str, str]:
@@ -604,12 +1078,11 @@ class SmileHelper:
         Obtain the rule_id from the given name and and provide the location_id, when present.
         """
         schedule_ids: dict[str, str] = {}
-        locator = f'./contexts/context/zone/location[@id="{loc_id}"]'
-        for rule in self._domain_objects.findall(f'./rule[name="{name}"]'):
-            if rule.find(locator) is not None:
-                schedule_ids[rule.attrib["id"]] = loc_id
+        for rule_id in self._rule_names.get(name, []):
+            if loc_id in self._rule_locations[rule_id]:
+                schedule_ids[rule_id] = loc_id
             else:
-                schedule_ids[rule.attrib["id"]] = NONE
+                schedule_ids[rule_id] = NONE
 
         return schedule_ids
 
@@ -619,14 +1092,11 @@ class SmileHelper:
         Obtain the rule_id from the given template_tag and provide the location_id, when present.
         """
         schedule_ids: dict[str, str] = {}
-        locator1 = f'./template[@tag="{tag}"]'
-        locator2 = f'./contexts/context/zone/location[@id="{loc_id}"]'
-        for rule in self._domain_objects.findall("./rule"):
-            if rule.find(locator1) is not None:
-                if rule.find(locator2) is not None:
-                    schedule_ids[rule.attrib["id"]] = loc_id
-                else:
-                    schedule_ids[rule.attrib["id"]] = NONE
+        for rule_id in self._rule_tags.get(tag, []):
+            if loc_id in self._rule_locations[rule_id]:
+                schedule_ids[rule_id] = loc_id
+            else:
+                schedule_ids[rule_id] = NONE
 
         return schedule_ids
 
@@ -634,42 +1104,60 @@ class SmileHelper:
         self,
         appliance: etree,
         data: DeviceData,
-        measurements: dict[str, DATA | UOM],
+        plan: dict[str, tuple[str, str, str | None]],
     ) -> None:
         """Helper-function for _get_measurement_data() - collect appliance measurement data."""
-        for measurement, attrs in measurements.items():
-            p_locator = f'.//logs/point_log[type="{measurement}"]/period/measurement'
-            if (appl_p_loc := appliance.find(p_locator)) is not None:
+        # Collect the measurements of the appliance in one pass,
+        # the first found per log-type is used
+        point_logs: dict[str, etree] = {}
+        point_dates: dict[str, etree] = {}
+        interval_logs: dict[str, etree] = {}
+        for log in appliance.iterfind(".//logs/*"):
+            if log.tag not in ("point_log", "interval_log"):
+                continue
+            if (log_type := log.find("type")) is None:
+                continue  # pragma: no cover
+            if log.tag == "interval_log":
+                if (
+                    log_type.text not in interval_logs
+                    and (measure := log.find("period/measurement")) is not None
+                ):
+                    interval_logs[log_type.text] = measure
+                continue
+            if (
+                log_type.text not in point_logs
+                and (measure := log.find("period/measurement")) is not None
+            ):
+                point_logs[log_type.text] = measure
+            if (
+                log_type.text not in point_dates
+                and (updated_date_key := log.find("updated_date")) is not None
+            ):
+                point_dates[log_type.text] = updated_date_key
+
+        for measurement, (new_name, unit, kind) in plan.items():
+            if (appl_p_loc := point_logs.get(measurement)) is not None:
                 # Skip known obsolete measurements
-                updated_date_locator = (
-                    f'.//logs/point_log[type="{measurement}"]/updated_date'
-                )
                 if measurement in OBSOLETE_MEASUREMENTS:
-                    if (
-                        updated_date_key := appliance.find(updated_date_locator)
-                    ) is not None:
+                    if (updated_date_key := point_dates.get(measurement)) is not None:
                         updated_date = updated_date_key.text.split("T")[0]
                         date_1 = dt.datetime.strptime(updated_date, "%Y-%m-%d")
                         date_2 = dt.datetime.now()
                         if int((date_2 - date_1).days) > 7:
                             continue
 
-                if new_name := getattr(attrs, ATTR_NAME, None):
-                    measurement = new_name
-
-                match measurement:
+                measurement = new_name
+                match kind:
                     # measurements with states "on" or "off" that need to be passed directly
                     case "select_dhw_mode":
                         data["select_dhw_mode"] = appl_p_loc.text
-                    case _ as measurement if measurement in BINARY_SENSORS:
+                    case "binary_sensors":
                         bs_key = cast(BinarySensorType, measurement)
                         bs_value = appl_p_loc.text in ["on", "true"]
                         data["binary_sensors"][bs_key] = bs_value
-                    case _ as measurement if measurement in SENSORS:
+                    case "sensors":
                         s_key = cast(SensorType, measurement)
-                        s_value = format_measure(
-                            appl_p_loc.text, getattr(attrs, ATTR_UNIT_OF_MEASUREMENT)
-                        )
+                        s_value = format_measure(appl_p_loc.text, unit)
                         data["sensors"][s_key] = s_value
                         # Anna: save cooling-related measurements for later use
                         # Use the local outdoor temperature as reference for turning cooling on/off
@@ -685,7 +1173,7 @@ class SmileHelper:
                             self._outdoor_temp = data["sensors"][
                                 "outdoor_air_temperature"
                             ]
-                    case _ as measurement if measurement in SWITCHES:
+                    case "switches":
                         sw_key = cast(SwitchType, measurement)
                         sw_value = appl_p_loc.text in ["on", "true"]
                         data["switches"][sw_key] = sw_value
@@ -695,8 +1183,7 @@ class SmileHelper:
                     case "elga_status_code":
                         data["elga_status_code"] = int(appl_p_loc.text)
 
-            i_locator = f'.//logs/interval_log[type="{measurement}"]/period/measurement'
-            if (appl_i_loc := appliance.find(i_locator)) is not None:
+            if (appl_i_loc := interval_logs.get(measurement)) is not None:
                 name = cast(SensorType, f"{measurement}_interval")
                 data["sensors"][name] = format_measure(
                     appl_i_loc.text, ENERGY_WATT_HOUR
@@ -716,13 +1203,11 @@ class SmileHelper:
         if self.smile(ADAM):
             # Collect for Plugs
             locator = "./logs/interval_log/electricity_interval_meter"
-            mod_type = "electricity_interval_meter"
-            module_data = self._get_module_data(appliance, locator, mod_type)
+            module_data = self._get_module_data(appliance, locator)
             if module_data["reachable"] is None:
                 # Collect for wireless thermostats
                 locator = "./logs/point_log[type='thermostat']/thermostat"
-                mod_type = "thermostat"
-                module_data = self._get_module_data(appliance, locator, mod_type)
+                module_data = self._get_module_data(appliance, locator)
 
             if module_data["reachable"] is not None:
                 data["available"] = module_data["reachable"]
@@ -866,14 +1351,12 @@ class SmileHelper:
 
             return data
 
-        measurements = DEVICE_MEASUREMENTS
+        plan = DEVICE_MEASUREMENT_PLAN
         if self._is_thermostat and dev_id == self._heater_id:
-            measurements = HEATER_CENTRAL_MEASUREMENTS
+            plan = HEATER_CENTRAL_MEASUREMENT_PLAN
 
-        if (
-            appliance := self._domain_objects.find(f'./appliance[@id="{dev_id}"]')
-        ) is not None:
-            self._appliance_measurements(appliance, data, measurements)
+        if (appliance := self._appliances.get(dev_id)) is not None:
+            self._appliance_measurements(appliance, data, plan)
             self._get_lock_state(appliance, data)
 
             for toggle, name in TOGGLES.items():
@@ -968,8 +1451,10 @@ class SmileHelper:
             "thermostatic_radiator_valve": 1,
         }
 
+        # Only rank the devices present in each location
         for loc_id in self._thermo_locs:
-            for dev_id, device in self.gw_devices.items():
+            for dev_id in self._loc_devices[loc_id]:
+                device = self.gw_devices[dev_id]
                 self._rank_thermostat(thermo_matching, loc_id, dev_id, device)
 
         # Update slave thermostat class where needed
@@ -984,8 +1469,8 @@ class SmileHelper:
 
         Determine the location-set_temperature uri - from LOCATIONS.
         """
-        locator = f'./location[@id="{loc_id}"]/actuator_functionalities/thermostat_functionality'
-        thermostat_functionality_id = self._domain_objects.find(locator).attrib["id"]
+        locator = "./actuator_functionalities/thermostat_functionality"
+        thermostat_functionality_id = self._locations[loc_id].find(locator).attrib["id"]
 
         return f"{LOCATIONS};id={loc_id}/thermostat;id={thermostat_functionality_id}"
 
@@ -999,7 +1484,7 @@ class SmileHelper:
         if self.smile_type == "power" or self.smile(ANNA):
             return switch_groups
 
-        for group in self._domain_objects.findall("./group"):
+        for group in self._groups.values():
             members: list[str] = []
             group_id = group.attrib["id"]
             group_name = group.find("name").text
@@ -1025,22 +1510,25 @@ class SmileHelper:
 
         return switch_groups
 
-    def _heating_valves(self) -> int | bool:
-        """Helper-function for smile.py: _device_data_adam().
+    def _heating_valves(self) -> None:
+        """Helper-function for smile.py: _update_gw_devices().
 
-        Collect amount of open valves indicating active direct heating.
-        For cases where the heat is provided from an external shared source (city heating).
+        Collect the valve-positions, once per update.
+        The amount of open valves indicates active direct heating,
+        for cases where the heat is provided from an external shared source (city heating).
         """
         loc_found: int = 0
         open_valve_count: int = 0
-        for appliance in self._domain_objects.findall("./appliance"):
-            locator = './logs/point_log[type="valve_position"]/period/measurement'
+        self._valve_positions = []
+        locator = './logs/point_log[type="valve_position"]/period/measurement'
+        for appliance in self._appliances.values():
             if (appl_loc := appliance.find(locator)) is not None:
                 loc_found += 1
                 if float(appl_loc.text) > 0.0:
                     open_valve_count += 1
+                self._valve_positions.append(format_measure(appl_loc.text, PERCENTAGE))
 
-        return False if loc_found == 0 else open_valve_count
+        self._open_valves = False if loc_found == 0 else open_valve_count
 
     def power_data_energy_diff(
         self,
@@ -1073,70 +1561,38 @@ class SmileHelper:
 
         return direct_data
 
-    def _power_data_peak_value(self, direct_data: DeviceData, loc: Munch) -> Munch:
-        """Helper-function for _power_data_from_location() and _power_data_from_modules()."""
-        loc.found = True
-        # If locator not found look for P1 gas_consumed or phase data (without tariff)
-        if loc.logs.find(loc.locator) is None:
-            if "log" in loc.log_type and (
-                "gas" in loc.measurement or "phase" in loc.measurement
-            ):
-                # Avoid double processing by skipping one peak-list option
-                if loc.peak_select == "nl_offpeak":
-                    loc.found = False
-                    return loc
-
-                loc.locator = (
-                    f'./{loc.log_type}[type="{loc.measurement}"]/period/measurement'
-                )
-                if loc.logs.find(loc.locator) is None:
-                    loc.found = False
-                    return loc
-
-        if (peak := loc.peak_select.split("_")[1]) == "offpeak":
-            peak = "off_peak"
-        log_found = loc.log_type.split("_")[0]
-        loc.key_string = f"{loc.measurement}_{peak}_{log_found}"
-        if "gas" in loc.measurement or loc.log_type == "point_meter":
-            loc.key_string = f"{loc.measurement}_{log_found}"
-        if "phase" in loc.measurement:
-            loc.key_string = f"{loc.measurement}"
-        loc.net_string = f"net_electricity_{log_found}"
-        val = loc.logs.find(loc.locator).text
-        loc.f_val = power_data_local_format(loc.attrs, loc.key_string, val)
-
-        return loc
-
     def _power_data_from_location(self, loc_id: str) -> DeviceData:
         """Helper-function for smile.py: _get_device_data().
 
         Collect the power-data based on Location ID, from LOCATIONS.
         """
         direct_data: DeviceData = {"sensors": {}}
-        loc = Munch()
-        log_list: list[str] = ["point_log", "cumulative_log", "interval_log"]
-        peak_list: list[str] = ["nl_peak", "nl_offpeak"]
-        t_string = "tariff"
-
-        search = self._domain_objects
-        loc.logs = search.find(f'./location[@id="{loc_id}"]/logs')
-        for loc.measurement, loc.attrs in P1_MEASUREMENTS.items():
-            for loc.log_type in log_list:
-                for loc.peak_select in peak_list:
-                    # meter_string = ".//{}[type='{}']/"
-                    loc.locator = (
-                        f'./{loc.log_type}[type="{loc.measurement}"]/period/'
-                        f'measurement[@{t_string}="{loc.peak_select}"]'
-                    )
-                    loc = self._power_data_peak_value(direct_data, loc)
-                    if not loc.found:
-                        continue
 
-                    direct_data = self.power_data_energy_diff(
-                        loc.measurement, loc.net_string, loc.f_val, direct_data
-                    )
-                    key = cast(SensorType, loc.key_string)
-                    direct_data["sensors"][key] = loc.f_val
+        # Classify all measurements in one pass, by log-type, type and tariff,
+        # the first found is used, ANY_TARIFF collects the first of any tariff
+        values: dict[tuple[str, str, str], str] = {}
+        logs = self._locations[loc_id].find("./logs")
+        for log in logs if logs is not None else ():
+            if (log_type := log.find("type")) is None:
+                continue  # pragma: no cover
+            for measure in log.iterfind("period/measurement"):
+                if (tariff := measure.get("tariff")) is not None:
+                    values.setdefault((log.tag, log_type.text, tariff), measure.text)
+                values.setdefault((log.tag, log_type.text, ANY_TARIFF), measure.text)
+
+        for item in P1_MEASUREMENT_PLAN:
+            val = values.get((item.log_type, item.measurement, item.tariff))
+            if val is None and item.fallback:
+                val = values.get((item.log_type, item.measurement, ANY_TARIFF))
+            if val is None:
+                continue
+
+            f_val = power_data_local_format(item.attrs, item.key_string, val)
+            direct_data = self.power_data_energy_diff(
+                item.measurement, item.net_string, f_val, direct_data
+            )
+            key = cast(SensorType, item.key_string)
+            direct_data["sensors"][key] = f_val
 
         self._count += len(direct_data["sensors"])
         return direct_data
@@ -1146,8 +1602,10 @@ class SmileHelper:
 
         Collect the active preset based on Location ID.
         """
-        locator = f'./location[@id="{loc_id}"]/preset'
-        if (preset := self._domain_objects.find(locator)) is not None:
+        if (location := self._locations.get(loc_id)) is None:
+            return None  # pragma: no cover
+
+        if (preset := location.find("./preset")) is not None:
             return str(preset.text)
 
         return None
@@ -1173,10 +1631,8 @@ class SmileHelper:
 
         schedules: list[str] = []
         for rule_id, loc_id in rule_ids.items():
-            name = self._domain_objects.find(f'./rule[@id="{rule_id}"]/name').text
-            locator = f'./rule[@id="{rule_id}"]/directives'
             # Show an empty schedule as no schedule found
-            if not self._domain_objects.find(locator):
+            if (name := self._schedule_names.get(rule_id)) is None:
                 continue
 
             available.append(name)
@@ -1197,11 +1653,14 @@ class SmileHelper:
 
         Determine the last-used schedule based on the modified date.
         """
+        from dateutil import tz  # pylint: disable=import-outside-toplevel
+        from dateutil.parser import parse  # pylint: disable=import-outside-toplevel
+
         epoch = dt.datetime(1970, 1, 1, tzinfo=tz.tzutc())
         schedules_dates: dict[str, float] = {}
 
         for name in schedules:
-            result = self._domain_objects.find(f'./rule[name="{name}"]')
+            result = self._rules[self._rule_names[name][0]]
             schedule_date = result.find("modified_date").text
             schedule_time = parse(schedule_date)
             schedules_dates[name] = (schedule_time - epoch).total_seconds()
@@ -1214,9 +1673,11 @@ class SmileHelper:
         Obtain the value/state for the given object from a location in DOMAIN_OBJECTS
         """
         val: float | int | None = None
-        search = self._domain_objects
-        locator = f'./location[@id="{obj_id}"]/logs/point_log[type="{measurement}"]/period/measurement'
-        if (found := search.find(locator)) is not None:
+        if (location := self._locations.get(obj_id)) is None:
+            return val  # pragma: no cover
+
+        locator = f'./logs/point_log[type="{measurement}"]/period/measurement'
+        if (found := location.find(locator)) is not None:
             val = format_measure(found.text, NONE)
             return val
 
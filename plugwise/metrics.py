@@ -0,0 +1,102 @@
+"""Use of this source code is governed by the MIT license found in the LICENSE file.
+
+Plugwise metrics: the timings and sizes of the requests and the updates.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+import math
+from typing import ClassVar
+
+
+@dataclass
+class RequestMetrics:
+    """The metrics of a request to the Smile, the times in seconds.
+
+    The response_time covers the connection and the time to the first byte,
+    the body_time the receiving of the body, including the parsing while receiving.
+    With offload=True the XML-data is parsed after receiving, in parse_time.
+    """
+
+    FIELDS: ClassVar[tuple[str, ...]] = (
+        "response_time",
+        "body_time",
+        "parse_time",
+        "bytes_received",
+        "retries",
+    )
+
+    command: str
+    method: str
+    status: int = 0
+    response_time: float = 0.0
+    body_time: float = 0.0
+    parse_time: float = 0.0
+    bytes_received: int = 0
+    retries: int = 0
+
+
+@dataclass
+class UpdateMetrics:
+    """The metrics of the processing of the domain_objects into the device data."""
+
+    FIELDS: ClassVar[tuple[str, ...]] = ("transform_time", "devices", "items")
+
+    discovery: bool
+    transform_time: float
+    devices: int
+    items: int
+
+
+Metrics = RequestMetrics | UpdateMetrics
+MetricsListener = Callable[[Metrics], None]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class SmileStats:
+    """Keep the most recent metrics in memory, for the percentiles.
+
+    Add as listener: smile.add_metrics_listener(stats). The values are kept
+    per metric-name, e.g. get.response_time, put.retries, update.transform_time.
+    """
+
+    def __init__(self, size: int = 1000) -> None:
+        """Set the constructor for this class."""
+        self._size = size
+        self._values: dict[str, deque[float]] = {}
+
+    def __call__(self, metrics: Metrics) -> None:
+        """Add the values of the metrics."""
+        prefix = "update"
+        if isinstance(metrics, RequestMetrics):
+            prefix = metrics.method
+
+        for name in metrics.FIELDS:
+            key = f"{prefix}.{name}"
+            if key not in self._values:
+                self._values[key] = deque(maxlen=self._size)
+            self._values[key].append(getattr(metrics, name))
+
+    def percentile(self, name: str, pct: float) -> float | None:
+        """Return the percentile of a metric, None when not measured."""
+        if not (values := self._values.get(name)):
+            return None
+        return percentile(list(values), pct)
+
+    def summary(
+        self, percentiles: tuple[float, ...] = (50, 90, 99)
+    ) -> dict[str, dict[str, float]]:
+        """Return the count and the percentiles of all metrics."""
+        result: dict[str, dict[str, float]] = {}
+        for name, values in self._values.items():
+            result[name] = {"count": len(values)}
+            for pct in percentiles:
+                result[name][f"p{pct:g}"] = percentile(list(values), pct)
+        return result
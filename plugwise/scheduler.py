@@ -0,0 +1,77 @@
+"""Use of this source code is governed by the MIT license found in the LICENSE file.
+
+Plugwise adaptive polling: adapt the update interval to the change rate of the data.
+"""
+from __future__ import annotations
+
+from .constants import (
+    DEFAULT_FAST_REFRESH,
+    DEFAULT_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    PlugwiseChanges,
+)
+
+# Change rates, the fraction of the updates in which a field changed
+BACK_OFF_RATE = 0.1
+SPEED_UP_RATE = 0.5
+FORGET_RATE = 0.001
+
+
+class AdaptiveScheduler:
+    """Adapt the polling interval of a gateway to the change rate of its data.
+
+    Per field the fraction of the updates in which it changed is tracked as an exponential
+    moving average. When the fastest changing field changes in most updates the interval is halved,
+    when it rarely changes the interval is increased by half, within the bounds.
+    After a setter-call the gateway is polled again after fast_refresh seconds.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        fast_refresh: float = DEFAULT_FAST_REFRESH,
+        smoothing: float = 0.3,
+    ) -> None:
+        """Set the constructor for this class."""
+        self._observed = False
+        self._smoothing = smoothing
+        self.change_rate = 0.0
+        self.fast_refresh = fast_refresh
+        self.field_rates: dict[str, float] = {}
+        self.max_interval = max_interval
+        self.min_interval = min_interval
+        self.interval = min(max(interval, min_interval), max_interval)
+
+    def update(self, changes: PlugwiseChanges) -> float:
+        """Track the changes of an update, return the interval until the next update."""
+        # The first update shows all data as changed
+        if not self._observed:
+            self._observed = True
+            return self.interval
+
+        changed = {f"gateway/{key}" for key in changes.gateway}
+        for dev_id, dev_changes in changes.devices.items():
+            for platform, items in dev_changes.items():
+                changed.update(f"{dev_id}/{platform}/{item}" for item in items)
+
+        alpha = self._smoothing
+        self.change_rate = (1 - alpha) * self.change_rate + alpha * bool(changed)
+        for key in set(self.field_rates) | changed:
+            rate = (1 - alpha) * self.field_rates.get(key, 0.0)
+            if key in changed:
+                rate += alpha
+            if rate < FORGET_RATE:
+                self.field_rates.pop(key, None)
+                continue
+            self.field_rates[key] = rate
+
+        fastest = max(self.field_rates.values(), default=0.0)
+        if fastest > SPEED_UP_RATE:
+            self.interval = max(self.interval / 2, self.min_interval)
+        elif fastest < BACK_OFF_RATE:
+            self.interval = min(self.interval * 1.5, self.max_interval)
+
+        return self.interval
@@ -4,12 +4,11 @@ from __future__ import annotations
 import re
 
 from .constants import (
-    ELECTRIC_POTENTIAL_VOLT,
     ENERGY_KILO_WATT_HOUR,
     HW_MODELS,
     PERCENTAGE,
-    SPECIAL_FORMAT,
     TEMP_CELSIUS,
+    UNIT_DECIMALS,
 )
 
 
@@ -18,35 +17,46 @@ def escape_illegal_xml_characters(xmldata: str) -> str:
     return re.sub(r"&([^a-zA-Z#])", r"&amp;\1", xmldata)
 
 
+def escape_illegal_xml_bytes(xmldata: bytes) -> bytes:
+    """Replace illegal &-characters, in (a chunk of) raw XML-data."""
+    return re.sub(rb"&([^a-zA-Z#])", rb"&amp;\1", xmldata)
+
+
 def format_measure(measure: str, unit: str) -> float | int:
-    """Format measure to correct type."""
-    result: float | int = 0
-    try:
-        result = int(measure)
-        if unit == TEMP_CELSIUS:
-            result = float(measure)
-    except ValueError:
-        float_measure = float(measure)
-        if unit == PERCENTAGE:
-            if 0 < float_measure <= 1:
-                return int(float_measure * 100)
-
-        if unit == ENERGY_KILO_WATT_HOUR:
-            float_measure = float_measure / 1000
-
-        if unit in SPECIAL_FORMAT:
-            result = float(f"{round(float_measure, 3):.3f}")
-        elif unit == ELECTRIC_POTENTIAL_VOLT:
-            result = float(f"{round(float_measure, 1):.1f}")
+    """Format measure to correct type.
+
+    Rounding the float gives the same value as formatting and parsing the rounded float.
+    """
+    # A measure with a decimal point is never an int, skip the failing int()
+    if "." not in measure:
+        try:
+            result = int(measure)
+        except ValueError:
+            pass
         else:
-            if abs(float_measure) < 10:
-                result = float(f"{round(float_measure, 2):.2f}")
-            elif abs(float_measure) >= 10 and abs(float_measure) < 100:
-                result = float(f"{round(float_measure, 1):.1f}")
-            elif abs(float_measure) >= 100:
-                result = int(round(float_measure))
-
-    return result
+            if unit == TEMP_CELSIUS:
+                return float(measure)
+            return result
+
+    float_measure = float(measure)
+    if unit == PERCENTAGE and 0 < float_measure <= 1:
+        return int(float_measure * 100)
+
+    if unit == ENERGY_KILO_WATT_HOUR:
+        float_measure = float_measure / 1000
+
+    if (decimals := UNIT_DECIMALS.get(unit)) is not None:
+        return round(float_measure, decimals)
+
+    if (magnitude := abs(float_measure)) < 10:
+        return round(float_measure, 2)
+    if magnitude < 100:
+        return round(float_measure, 1)
+    if magnitude >= 100:
+        return int(round(float_measure))
+
+    # NaN
+    return 0
 
 
 # NOTE: this function version_to_model is shared between Smile and USB
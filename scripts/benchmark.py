@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Benchmark the processing of the userdata fixtures.
+
+For every userdata setup this times the XML parsing, the indexing, the device
+discovery and refresh, a full async_update() against a local stub-Smile and each
+applicable setter, and traces the peak and retained memory of every phase.
+
+Usage: PYTHONPATH=$(pwd) python3 scripts/benchmark.py [-r ROUNDS] [-o FILE]
+       [--compare FILE] [--scaling N,N,...] [setup ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+
+from plugwise import Smile
+from plugwise.constants import (
+    ADAM,
+    DOMAIN_OBJECTS,
+    MAX_SETPOINT,
+    MIN_SETPOINT,
+    SWITCH_GROUP_TYPES,
+)
+from plugwise.exceptions import PlugwiseError
+from plugwise.helper import parse_xml
+from synthetic_fixtures import synthetic_domain_objects
+
+USERDATA = os.path.join(os.path.dirname(__file__), "../userdata")
+SKIPPED_SETUPS = ("fail_firmware",)
+SCALING_PHASES = ("get_all_devices", "refresh_devices", "async_update")
+
+
+class StubSmile:
+    """Local HTTP-server emulating the Smile API for the selected setup."""
+
+    def __init__(self) -> None:
+        """Set the constructor for this class."""
+        self.domain_objects = ""
+        self.port = 0
+        self._runner: web.AppRunner | None = None
+
+    async def start(self) -> None:
+        """Start serving on a free localhost port."""
+        app = web.Application()
+        app.router.add_get(DOMAIN_OBJECTS, self._domain_objects)
+        app.router.add_route("PUT", "/{tail:.*}", self._accepted)
+        app.router.add_route("DELETE", "/{tail:.*}", self._accepted)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _domain_objects(self, request: web.Request) -> web.Response:
+        """Render the domain objects of the selected setup."""
+        return web.Response(text=self.domain_objects, content_type="text/xml")
+
+    @staticmethod
+    async def _accepted(request: web.Request) -> web.Response:
+        """Render the response to a setter-request."""
+        return web.Response(status=202, text="<xml />")
+
+
+def userdata_setups() -> list[str]:
+    """Collect the userdata setups, including the updated ones."""
+    setups: list[str] = []
+    for root, _, files in os.walk(USERDATA):
+        if "core.domain_objects.xml" not in files:
+            continue
+        setup = os.path.relpath(root, USERDATA)
+        if os.path.basename(setup) not in SKIPPED_SETUPS:
+            setups.append(setup)
+
+    return sorted(setups)
+
+
+async def measure(func: Callable[[], Any], rounds: int) -> dict[str, Any]:
+    """Time func over the given rounds, then trace the memory use of one more call."""
+    timings: list[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        if isinstance(result := func(), Awaitable):
+            await result
+        timings.append((time.perf_counter() - start) * 1000)
+
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    if isinstance(result := func(), Awaitable):
+        await result
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "max_ms": round(max(timings), 4),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1),
+        "net_blocks": sys.getallocatedblocks() - blocks,
+    }
+
+
+def setter_calls(smile: Smile) -> dict[str, Callable[[], Awaitable[None]]]:
+    """Collect one representative call per setter supported by the setup."""
+    calls: dict[str, Callable[[], Awaitable[None]]] = {}
+    for dev_id, device in smile.gw_devices.items():
+        switches = device.get("switches", {})
+        if "thermostat" in device and "set_temperature" not in calls:
+            loc_id = device["location"]
+            items = {"setpoint": 20.0}
+            if smile._cooling_present and not smile.smile(ADAM):
+                items = {"setpoint_low": 20.0, "setpoint_high": MAX_SETPOINT}
+                if smile._cooling_enabled:
+                    items = {"setpoint_low": MIN_SETPOINT, "setpoint_high": 23.0}
+            calls["set_temperature"] = partial(smile.set_temperature, loc_id, items)
+            if presets := device.get("preset_modes"):
+                calls["set_preset"] = partial(smile.set_preset, loc_id, presets[0])
+            schedules = device.get("available_schedules", ["None"])
+            if schedules != ["None"]:
+                calls["set_schedule_state"] = partial(
+                    toggle_schedule, smile, loc_id, schedules[0]
+                )
+        if "maximum_boiler_temperature" in device:
+            calls["set_number_setpoint"] = partial(
+                smile.set_number_setpoint, "maximum_boiler_temperature", dev_id, 60.0
+            )
+        if device.get("dev_class") in SWITCH_GROUP_TYPES:
+            calls.setdefault(
+                "set_switch_state_group",
+                partial(
+                    smile.set_switch_state, dev_id, device["members"], "relay", "on"
+                ),
+            )
+        elif "relay" in switches and not switches.get("lock"):
+            calls.setdefault(
+                "set_switch_state",
+                partial(smile.set_switch_state, dev_id, None, "relay", "on"),
+            )
+        for model in ("dhw_cm_switch", "cooling_ena_switch", "lock"):
+            if model in switches:
+                calls.setdefault(
+                    f"set_switch_state_{model}",
+                    partial(smile.set_switch_state, dev_id, None, model, "on"),
+                )
+
+    if smile.therms_with_offset_func:
+        calls["set_temperature_offset"] = partial(
+            smile.set_temperature_offset,
+            "temperature_offset",
+            smile.therms_with_offset_func[0],
+            1.0,
+        )
+    if smile._reg_allowed_modes:
+        calls["set_regulation_mode"] = partial(
+            smile.set_regulation_mode, smile._reg_allowed_modes[0]
+        )
+    if smile._dhw_allowed_modes:
+        calls["set_dhw_mode"] = partial(smile.set_dhw_mode, smile._dhw_allowed_modes[0])
+    calls["delete_notification"] = smile.delete_notification
+
+    return dict(sorted(calls.items()))
+
+
+async def toggle_schedule(smile: Smile, loc_id: str, name: str) -> None:
+    """Switch the given schedule on and off again, leaving the rule unchanged.
+
+    Two requests per call, but every call then performs the same work.
+    """
+    old_state = smile._schedule_old_states[loc_id][name]
+    last_active = smile._last_active.get(loc_id)
+    smile._schedule_old_states[loc_id][name] = "off"
+    await smile.set_schedule_state(loc_id, "on", name)
+    await smile.set_schedule_state(loc_id, "off", name)
+    smile._schedule_old_states[loc_id][name] = old_state
+    smile._last_active[loc_id] = last_active
+
+
+def userdata_domain_objects(setup: str) -> str:
+    """Return the domain_objects of the given userdata setup."""
+    userdata = os.path.join(USERDATA, setup, "core.domain_objects.xml")
+    with open(userdata, encoding="utf-8") as filedata:
+        return filedata.read()
+
+
+def scaled_domain_objects(locations: int) -> str:
+    """Return the domain_objects of a synthetic installation with the given zones.
+
+    Every zone has a Lisa and a Tom, and there is a plug and a schedule per zone
+    and a switch group per 10 plugs.
+    """
+    return synthetic_domain_objects(
+        locations, plugs=locations, rules=locations, groups=max(1, locations // 10)
+    )
+
+
+async def benchmark_setup(
+    domain_objects: str, stub: StubSmile, session: aiohttp.ClientSession, rounds: int
+) -> dict[str, Any]:
+    """Benchmark all phases for one setup."""
+    stub.domain_objects = domain_objects
+    phases: dict[str, Any] = {}
+    xmldata = domain_objects.encode()
+    phases["parse"] = await measure(partial(parse_xml, xmldata), rounds)
+
+    smile = Smile(
+        host="127.0.0.1",
+        password="benchmark",
+        port=stub.port,
+        websession=session,
+    )
+    await smile.connect()
+    phases["index"] = await measure(smile._index_domain_objects, rounds)
+    phases["get_all_devices"] = await measure(smile.get_all_devices, rounds)
+    phases["refresh_devices"] = await measure(smile.refresh_devices, rounds)
+    phases["async_update"] = await measure(smile.async_update, rounds)
+    for name, call in setter_calls(smile).items():
+        try:
+            phases[name] = await measure(call, rounds)
+        except PlugwiseError as err:
+            phases[name] = {"error": str(err)}
+
+    return phases
+
+
+def git_revision() -> str | None:
+    """Return the current commit, so results can be compared between commits."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """Show the median timing ratio of every phase against an earlier run."""
+    print(  # noqa: T201
+        f"Compared with {baseline['meta'].get('revision')} (ratio < 1.00 is faster)"
+    )
+    for setup, phases in results["setups"].items():
+        for phase, stats in phases.items():
+            base = baseline["setups"].get(setup, {}).get(phase, {})
+            if "median_ms" not in stats or not base.get("median_ms"):
+                continue
+            ratio = stats["median_ms"] / base["median_ms"]
+            print(f"{setup:45} {phase:32} {ratio:6.2f}")  # noqa: T201
+
+
+def plot_scaling(results: dict[str, Any]) -> None:
+    """Plot the median time of the polling phases against the number of zones."""
+    scaling = {
+        int(setup.split("/")[1]): phases
+        for setup, phases in results["setups"].items()
+        if setup.startswith("synthetic/")
+    }
+    for phase in SCALING_PHASES:
+        longest = max(phases[phase]["median_ms"] for phases in scaling.values())
+        print(f"{phase} (median ms) against the number of zones")  # noqa: T201
+        for locations, phases in sorted(scaling.items()):
+            median = phases[phase]["median_ms"]
+            bar = "#" * round(50 * median / longest)
+            print(f"{locations:6} {median:10.3f} {bar}")  # noqa: T201
+
+
+async def main() -> None:
+    """Run the benchmarks and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("setups", nargs="*", help="userdata setups, default: all")
+    parser.add_argument("-r", "--rounds", type=int, default=25)
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier output to compare with")
+    parser.add_argument(
+        "--scaling",
+        help="comma-separated zone counts of synthetic installations to benchmark",
+    )
+    args = parser.parse_args()
+
+    setups: dict[str, Callable[[], str]] = {}
+    if args.scaling:
+        for locations in map(int, args.scaling.split(",")):
+            setups[f"synthetic/{locations}"] = partial(scaled_domain_objects, locations)
+    if args.setups or not args.scaling:
+        for setup in args.setups or userdata_setups():
+            setups[setup] = partial(userdata_domain_objects, setup)
+
+    results: dict[str, Any] = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": args.rounds,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "setups": {},
+    }
+    stub = StubSmile()
+    await stub.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            for setup, domain_objects in setups.items():
+                phases = await benchmark_setup(
+                    domain_objects(), stub, session, args.rounds
+                )
+                results["setups"][setup] = phases
+                print(setup)  # noqa: T201
+                for phase, stats in phases.items():
+                    line = stats.get("error") or (
+                        f"{stats['median_ms']:9.3f} ms {stats['peak_kib']:9.1f} KiB"
+                    )
+                    print(f"  {phase:32} {line}")  # noqa: T201
+    finally:
+        await stub.stop()
+
+    with open(args.output, "w", encoding="utf-8") as outfile:
+        json.dump(results, outfile, indent=2)
+
+    if args.scaling:
+        plot_scaling(results)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as infile:
+            compare(results, json.load(infile))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Generate synthetic large-installation domain_objects from an existing fixture.
+
+The zones, devices, rules and groups of an Adam userdata setup are replaced by
+clones of its own objects, with new ids, names and MAC-addresses:
+N locations with M thermostats/valves each, K plugs, R schedules and G switch groups.
+
+Usage: PYTHONPATH=$(pwd) python3 scripts/synthetic_fixtures.py -l N [-d M] [-p K]
+       [-r R] [-g G] [-o FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import os
+from xml.etree import ElementTree
+
+from defusedxml import ElementTree as etree
+
+TEMPLATE = os.path.join(
+    os.path.dirname(__file__), "../userdata/adam_plus_anna_new/core.domain_objects.xml"
+)
+# The objects in the template the synthetic installation is assembled from
+ZONE_LOCATION = "f871b8c4d63549319221e294e4f88074"  # Bathroom
+ZONE_THERMOSTAT = "e2f4322d57924fa090fbbc48b3a140dc"  # Lisa Badkamer
+RADIATOR_VALVE = "1772a4ea304041adb83f357b751341ff"  # Tom Badkamer
+PLUG = "2568cc4b9c1e401495d4741a5f89bee1"  # Plug Werkplek
+PRESET_RULE = "91946f89120a44139959d6739b914679"  # Thermostat presets Bathroom
+SCHEDULE_RULE = "ebe3e57ec41d4d8faa927ca85c95b747"  # Badkamer
+SWITCH_GROUP = "e8ef2a01ed3b4139a53bf749204fe6b4"  # Test
+
+
+class SyntheticInstallation:
+    """Assemble the domain_objects of a synthetic installation."""
+
+    def __init__(self, template: str = TEMPLATE) -> None:
+        """Set the constructor for this class."""
+        self._root = etree.parse(template).getroot()
+        self._objects = {item.get("id"): item for item in self._root}
+        self._home = self._root.find("./location[type='building']").get("id")
+        self._mac_count = 0
+        self._modules: dict[str, list[ElementTree.Element]] = {}
+        for item in self._root.findall("./appliance"):
+            ids = {node.get("id") for node in item.iter()}
+            self._modules[item.get("id")] = [
+                module
+                for module in self._root.findall("./module")
+                if any(service.get("id") in ids for service in module.find("services"))
+            ]
+
+        # Remove all zone-objects, they are replaced by the synthetic ones
+        removed: list[ElementTree.Element] = []
+        for item in self._root:
+            location = item.find("location")
+            if (
+                item.tag in ("group", "rule")
+                or (item.tag == "location" and item.get("id") != self._home)
+                or (item.tag == "appliance" and location is not None)
+            ):
+                removed.append(item)
+                if item.tag == "appliance":
+                    removed.extend(self._modules[item.get("id")])
+        for item in removed:
+            if item in list(self._root):
+                self._root.remove(item)
+
+        self._external = {item.get("id") for item in self._root}
+        self._appliances: list[ElementTree.Element] = []
+        self._added: list[ElementTree.Element] = []
+
+    def _clone(self, object_id: str, key: str) -> ElementTree.Element:
+        """Copy a template-object, deriving new ids from the key.
+
+        References to the remaining (external) objects are left unchanged.
+        """
+        item = copy.deepcopy(self._objects[object_id])
+        for node in item.iter():
+            if (old := node.get("id")) is not None and old not in self._external:
+                node.set("id", hashlib.md5(f"{key}/{old}".encode()).hexdigest())
+        return item
+
+    def _add_device(
+        self, object_id: str, key: str, name: str, loc_id: str, groups: list[str]
+    ) -> str:
+        """Add an appliance, with its modules, to the given location."""
+        appliance = self._clone(object_id, key)
+        appliance.find("name").text = name
+        appliance.find("location").set("id", loc_id)
+        appliance.find("groups").clear()
+        for group_id in groups:
+            ElementTree.SubElement(appliance.find("groups"), "group", id=group_id)
+        self._appliances.append(appliance)
+        for module in self._modules[object_id]:
+            module = self._clone(module.get("id"), key)
+            for mac in module.iter("mac_address"):
+                self._mac_count += 1
+                mac.text = f"ABCD{self._mac_count:012X}"
+            self._added.append(module)
+
+        return appliance.get("id")
+
+    def build(
+        self, locations: int, devices: int, plugs: int, rules: int, groups: int
+    ) -> str:
+        """Return the domain_objects of the synthetic installation, build only once."""
+        zones: list[ElementTree.Element] = []
+        for index in range(1, locations + 1):
+            zone = self._clone(ZONE_LOCATION, f"zone{index}")
+            zone.find("name").text = f"Zone {index}"
+            zone.find("appliances").clear()
+            for number in range(devices):
+                template = ZONE_THERMOSTAT if number == 0 else RADIATOR_VALVE
+                model = "Lisa" if number == 0 else "Tom"
+                dev_id = self._add_device(
+                    template,
+                    f"zone{index}-{number}",
+                    f"{model} Zone {index}-{number}",
+                    zone.get("id"),
+                    [],
+                )
+                ElementTree.SubElement(zone.find("appliances"), "appliance", id=dev_id)
+            preset_rule = self._clone(PRESET_RULE, f"zone{index}")
+            preset_rule.find("contexts//location").set("id", zone.get("id"))
+            self._added.append(preset_rule)
+            zones.append(zone)
+
+        switch_groups: list[ElementTree.Element] = []
+        for index in range(1, groups + 1):
+            group = self._clone(SWITCH_GROUP, f"group{index}")
+            group.find("name").text = f"Group {index}"
+            group.find("appliances").clear()
+            switch_groups.append(group)
+
+        for index in range(1, plugs + 1):
+            location = zones[index % len(zones)] if zones else None
+            group = switch_groups[index % len(switch_groups)] if switch_groups else None
+            dev_id = self._add_device(
+                PLUG,
+                f"plug{index}",
+                f"Plug {index}",
+                self._home if location is None else location.get("id"),
+                [] if group is None else [group.get("id")],
+            )
+            if location is not None:
+                ElementTree.SubElement(
+                    location.find("appliances"), "appliance", id=dev_id
+                )
+            if group is not None:
+                ElementTree.SubElement(group.find("appliances"), "appliance", id=dev_id)
+
+        for index in range(1, rules + 1):
+            schedule = self._clone(SCHEDULE_RULE, f"schedule{index}")
+            schedule.find("name").text = f"Schedule {index}"
+            contexts = schedule.find("contexts")
+            # Only the first schedule of a zone is active
+            if index <= len(zones):
+                contexts.find(".//location").set("id", zones[index - 1].get("id"))
+            else:
+                contexts.clear()
+            self._added.append(schedule)
+
+        regulation = self._root.find("open_therm_regulation")
+        functionalities = regulation.find("thermostat_functionalities")
+        functionalities.clear()
+        for item in self._appliances + zones:
+            for func in item.iter("thermostat_functionality"):
+                ElementTree.SubElement(
+                    functionalities, "thermostat_functionality", id=func.get("id")
+                )
+        regulation.find("zones").clear()
+        for zone in zones:
+            ElementTree.SubElement(
+                regulation.find("zones"), "location", id=zone.get("id")
+            )
+
+        self._root.extend(self._appliances + self._added + zones + switch_groups)
+        ElementTree.indent(self._root, space="\t")
+        return ElementTree.tostring(
+            self._root, encoding="unicode", xml_declaration=True
+        )
+
+
+def synthetic_domain_objects(
+    locations: int, devices: int = 2, plugs: int = 0, rules: int = 0, groups: int = 0
+) -> str:
+    """Return the domain_objects of a synthetic installation of the given size."""
+    return SyntheticInstallation().build(locations, devices, plugs, rules, groups)
+
+
+def main() -> None:
+    """Write the domain_objects of a synthetic installation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-l", "--locations", type=int, required=True)
+    parser.add_argument("-d", "--devices", type=int, default=2, help="per location")
+    parser.add_argument("-p", "--plugs", type=int, default=0)
+    parser.add_argument("-r", "--rules", type=int, default=0)
+    parser.add_argument("-g", "--groups", type=int, default=0)
+    parser.add_argument("-o", "--output", default="core.domain_objects.xml")
+    args = parser.parse_args()
+
+    data = synthetic_domain_objects(
+        args.locations, args.devices, args.plugs, args.rules, args.groups
+    )
+    with open(args.output, "w", encoding="utf-8") as outfile:
+        outfile.write(data)
+
+
+if __name__ == "__main__":
+    main()
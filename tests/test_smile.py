@@ -1,6 +1,9 @@
 # pylint: disable=protected-access
 """Test Plugwise Home Assistant module and generate test JSON fixtures."""
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import hashlib
 import importlib
 import json
 
@@ -12,16 +15,25 @@ from pprint import PrettyPrinter
 # String generation
 import random
 import string
+import subprocess
+import sys
 from unittest.mock import patch
 
 # Testing
 import aiohttp
+from defusedxml import ElementTree as etree
 from freezegun import freeze_time
 import pytest
 
+pw_cache = importlib.import_module("plugwise.cache")
+pw_compact = importlib.import_module("plugwise.compact")
 pw_constants = importlib.import_module("plugwise.constants")
 pw_exceptions = importlib.import_module("plugwise.exceptions")
+pw_fleet = importlib.import_module("plugwise.fleet")
+pw_metrics = importlib.import_module("plugwise.metrics")
+pw_scheduler = importlib.import_module("plugwise.scheduler")
 pw_smile = importlib.import_module("plugwise")
+pw_util = importlib.import_module("plugwise.util")
 
 pytestmark = pytest.mark.asyncio
 
@@ -30,6 +42,38 @@ pp = PrettyPrinter(indent=8)
 _LOGGER = logging.getLogger(__name__)
 _LOGGER.setLevel(logging.DEBUG)
 
+
+def format_measure_reference(measure, unit):
+    """Format the measure as the original format_measure(), the reference."""
+    result = 0
+    try:
+        result = int(measure)
+        if unit == pw_constants.TEMP_CELSIUS:
+            result = float(measure)
+    except ValueError:
+        float_measure = float(measure)
+        if unit == pw_constants.PERCENTAGE:
+            if 0 < float_measure <= 1:
+                return int(float_measure * 100)
+
+        if unit == pw_constants.ENERGY_KILO_WATT_HOUR:
+            float_measure = float_measure / 1000
+
+        if unit in pw_constants.SPECIAL_FORMAT:
+            result = float(f"{round(float_measure, 3):.3f}")
+        elif unit == pw_constants.ELECTRIC_POTENTIAL_VOLT:
+            result = float(f"{round(float_measure, 1):.1f}")
+        else:
+            if abs(float_measure) < 10:
+                result = float(f"{round(float_measure, 2):.2f}")
+            elif abs(float_measure) >= 10 and abs(float_measure) < 100:
+                result = float(f"{round(float_measure, 1):.1f}")
+            elif abs(float_measure) >= 100:
+                result = int(round(float_measure))
+
+    return result
+
+
 # Prepare aiohttp app routes
 # taking self.smile_setup (i.e. directory name under userdata/{smile_app}/
 # as inclusion point
@@ -93,6 +137,9 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
             app.router.add_get("/core/domain_objects", self.smile_timeout)
         else:
             app.router.add_get("/core/domain_objects", self.smile_domain_objects)
+        app.router.add_get(
+            "/core/{kind:appliances|locations};id={obj_id}", self.smile_object
+        )
 
         # Introducte timeout with 2 seconds, test by setting response to 10ms
         # Don't actually wait 2 seconds as this will prolongue testing
@@ -129,7 +176,27 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         )
         with open(userdata, encoding="utf-8") as filedata:
             data = filedata.read()
-        return aiohttp.web.Response(text=data)
+        # Emulate the conditional request handling of the Smile
+        etag = f'"{hashlib.sha256(data.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            raise aiohttp.web.HTTPNotModified(headers={"ETag": etag})
+        return aiohttp.web.Response(text=data, headers={"ETag": etag})
+
+    async def smile_object(self, request):
+        """Render a single appliance or location from the domain objects."""
+        userdata = os.path.join(
+            os.path.dirname(__file__),
+            f"../userdata/{self.smile_setup}/core.domain_objects.xml",
+        )
+        kind = request.match_info["kind"]
+        domain_objects = etree.parse(userdata).getroot()
+        item = domain_objects.find(
+            f"./{kind[:-1]}[@id='{request.match_info['obj_id']}']"
+        )
+        if item is None:
+            raise aiohttp.web.HTTPNotFound()
+        text = f"<{kind}>{etree.tostring(item, encoding='unicode')}</{kind}>"
+        return aiohttp.web.Response(text=text)
 
     @classmethod
     async def smile_set_temp_or_preset(cls, request):
@@ -341,10 +408,17 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         if "heater_id" in data.gateway:
             self.cooling_present = data.gateway["cooling_present"]
         self.notifications = data.gateway["notifications"]
+        self.changes = data.changes
         self._write_json("all_data", {"gateway": data.gateway, "devices": data.devices})
         self._write_json("device_list", smile.device_list)
         self._write_json("notifications", data.gateway["notifications"])
 
+        # The compact devices reproduce the device data exactly, in order and type
+        compact = pw_compact.compact_devices(data.devices)
+        for dev_id, device in data.devices.items():
+            assert compact[dev_id] == device
+            assert json.dumps(compact[dev_id].to_dict()) == json.dumps(device)
+
         location_list = smile._thermo_locs
 
         _LOGGER.info("Gateway id = %s", data.gateway["gateway_id"])
@@ -768,9 +842,27 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         # Now change some data and change directory reading xml from
         # emulating reading newer dataset after an update_interval
         self.smile_setup = "updated/anna_v4"
+        # The device topology is unchanged: only refresh the device data
+        device_info = smile._device_info
         await self.device_test(
             smile, "2020-04-05 00:00:01", testdata_updated, initialize=False
         )
+        assert smile._device_info is device_info
+
+        # A renamed device, with unchanged ids, is discovered again
+        renamed = etree.parse(
+            os.path.join(
+                os.path.dirname(__file__),
+                f"../userdata/{self.smile_setup}/core.domain_objects.xml",
+            )
+        ).getroot()
+        anna_id = "01b85360fdd243d0aaad4d6ac2a5ba7e"
+        renamed.find(f"./appliance[@id='{anna_id}']/name").text = "Anna Woonkamer"
+        with patch.object(smile, "_request", return_value=renamed):
+            data = await smile.async_update()
+        assert smile._update_metrics.discovery
+        assert data.devices[anna_id]["name"] == "Anna Woonkamer"
+        assert data.changes.devices[anna_id]["attributes"] == {"name"}
 
         await smile.close_connection()
         await self.disconnect(server, client)
@@ -1231,7 +1323,7 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         assert smile.gateway_id == "da224107914542988a88561b4452b0f6"
         assert smile._last_active["f2bf9048bef64cc5b6d5110154e33c81"] == "Weekschema"
         assert smile._last_active["f871b8c4d63549319221e294e4f88074"] == "Badkamer"
-        assert smile.device_items == 145
+        assert smile.device_items == 147
         assert smile.device_list == [
             "da224107914542988a88561b4452b0f6",
             "056ee145a816487eaa69243c3280f8bf",
@@ -1244,6 +1336,17 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
             "ad4838d7d35c4d6ea796ee12ae5aedf8",
             "e8ef2a01ed3b4139a53bf749204fe6b4",
         ]
+        assert smile._loc_devices["f871b8c4d63549319221e294e4f88074"] == [
+            "1772a4ea304041adb83f357b751341ff",
+            "e2f4322d57924fa090fbbc48b3a140dc",
+        ]
+        assert smile._thermo_locs["f871b8c4d63549319221e294e4f88074"]["slaves"] == {
+            "1772a4ea304041adb83f357b751341ff"
+        }
+        # The module-info is indexed by the ids of the services of the module
+        module_data = smile._services["6c27ed100a734d7992a6326e96264658"]
+        assert module_data["zigbee_mac_address"] == "ABCD012345670A04"
+        assert module_data is smile._services["7bd4f266ed9844c4b1598cffb63db579"]
 
         result = await self.tinker_thermostat(
             smile,
@@ -1317,6 +1420,203 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         await smile.close_connection()
         await self.disconnect(server, client)
 
+    @pytest.mark.asyncio
+    async def test_adam_plus_anna_new_confirm_writes(self):
+        """Test the optimistic and the verified device data after a write."""
+        self.smile_setup = "adam_plus_anna_new"
+        server, smile, client = await self.connect_wrapper()
+        reference = await smile.async_update()
+        smiles = {}
+        for mode in ("optimistic", "verify"):
+            smiles[mode] = pw_smile.Smile(
+                host=server.host,
+                password=smile._auth.password,
+                port=server.port,
+                websession=client.session,
+                **{mode: True},
+            )
+            assert await smiles[mode].connect()
+
+        loc_id = "f2bf9048bef64cc5b6d5110154e33c81"
+        group_id = "e8ef2a01ed3b4139a53bf749204fe6b4"
+        members = reference.devices[group_id]["members"]
+        data = await smiles["optimistic"].async_update()
+        anna = data.devices["ad4838d7d35c4d6ea796ee12ae5aedf8"]
+        await smiles["optimistic"].set_temperature(loc_id, {"setpoint": 20.0})
+        assert anna["thermostat"]["setpoint"] == 20.0
+        assert anna["sensors"]["setpoint"] == 20.0
+        await smiles["optimistic"].set_preset(loc_id, "home")
+        assert anna["active_preset"] == "home"
+        await smiles["optimistic"].set_switch_state(group_id, members, "relay", "off")
+        assert not data.devices[group_id]["switches"]["relay"]
+        assert not data.devices[members[0]]["switches"]["relay"]
+
+        # The group-members are switched concurrently, the errors collected per member
+        request = smiles["optimistic"]._request
+
+        async def failing_request(command, *args, **kwargs):
+            if members[1] in command:
+                raise pw_exceptions.ErrorSendingCommandError
+            return await request(command, *args, **kwargs)
+
+        with patch.object(
+            smiles["optimistic"], "_request", failing_request
+        ), pytest.raises(pw_exceptions.SwitchGroupError) as group_error:
+            await smiles["optimistic"].set_switch_state(
+                group_id, members, "relay", "on"
+            )
+        assert list(group_error.value.errors) == [members[1]]
+        assert isinstance(
+            group_error.value.errors[members[1]], pw_exceptions.ErrorSendingCommandError
+        )
+        assert data.devices[members[0]]["switches"]["relay"]
+        assert not data.devices[members[1]]["switches"]["relay"]
+        assert not data.devices[group_id]["switches"]["relay"]
+        await smiles["optimistic"].set_regulation_mode("off")
+        assert data.devices[smile.gateway_id]["select_regulation_mode"] == "off"
+        assert anna["mode"] == "off"
+        await smiles["optimistic"].delete_notification()
+        assert not data.gateway["notifications"]
+        gateway = data.devices[smile.gateway_id]
+        assert not gateway["binary_sensors"]["plugwise_notification"]
+        assert smiles["optimistic"]._count == smile._count
+
+        # The emulated Smile does not apply the writes,
+        # the verified data equals the data before the write
+        data = await smiles["verify"].async_update()
+        appliance = smiles["verify"]._appliances["ad4838d7d35c4d6ea796ee12ae5aedf8"]
+        await smiles["verify"].set_temperature(loc_id, {"setpoint": 20.0})
+        assert (
+            smiles["verify"]._appliances["ad4838d7d35c4d6ea796ee12ae5aedf8"]
+            is not appliance
+        )
+        await smiles["verify"].set_preset(loc_id, "home")
+        await smiles["verify"].set_switch_state(group_id, members, "relay", "off")
+        await smiles["verify"].set_regulation_mode("off")
+        assert data.devices == reference.devices
+        assert smiles["verify"]._count == smile._count
+
+        await smile.close_connection()
+        await self.disconnect(server, client)
+
+    @pytest.mark.asyncio
+    async def test_adam_plus_anna_new_command_queue(self):
+        """Test sending the writes via the command queue."""
+        self.smile_setup = "adam_plus_anna_new"
+        server, smile, client = await self.connect_wrapper()
+        queued = pw_smile.Smile(
+            host=server.host,
+            password=smile._auth.password,
+            port=server.port,
+            websession=client.session,
+            optimistic=True,
+            command_queue=True,
+        )
+        assert await queued.connect()
+        data = await queued.async_update()
+
+        loc_id = "f2bf9048bef64cc5b6d5110154e33c81"
+        sent = []
+        queued.add_write_listener(sent.append)
+        with patch.object(queued, "_request", wraps=queued._request) as request:
+            await asyncio.gather(
+                queued.set_temperature(loc_id, {"setpoint": 19.0}),
+                queued.set_temperature(loc_id, {"setpoint": 20.0}),
+                queued.set_preset(loc_id, "home"),
+                queued.set_temperature(loc_id, {"setpoint": 21.0}),
+            )
+        # Only the superseded setpoint is not sent, the writes are sent in order
+        assert sent == [
+            queued._thermostat_uri(loc_id),
+            f"/core/locations;id={loc_id}",
+            queued._thermostat_uri(loc_id),
+        ]
+        data_sent = [
+            call.kwargs["data"]
+            for call in request.call_args_list
+            if call.kwargs.get("queued")
+        ]
+        assert "20.0" in data_sent[0]
+        assert "21.0" in data_sent[2]
+        anna = data.devices["ad4838d7d35c4d6ea796ee12ae5aedf8"]
+        assert anna["thermostat"]["setpoint"] == 21.0
+        assert anna["active_preset"] == "home"
+
+        # The lock and the state of a relay are written to the same URI, both are sent
+        plug_id = "854f8a9b0e7e425db97f1f110e1ce4b3"
+        with patch.object(queued, "_request", wraps=queued._request) as request:
+            await asyncio.gather(
+                queued.set_switch_state(plug_id, None, "lock", "on"),
+                queued.set_switch_state(plug_id, None, "relay", "off"),
+            )
+        data_sent = [
+            call.kwargs["data"]
+            for call in request.call_args_list
+            if call.kwargs.get("queued")
+        ]
+        assert "<lock>true</lock>" in data_sent[0]
+        assert "<state>off</state>" in data_sent[1]
+        assert not data.devices[plug_id]["switches"]["relay"]
+
+        await smile.close_connection()
+        await self.disconnect(server, client)
+
+    @pytest.mark.asyncio
+    async def test_adam_plus_anna_new_discovery_cache(self, tmp_path):
+        """Test the warm start from the discovery cache."""
+        self.smile_setup = "adam_plus_anna_new"
+        server, smile, client = await self.connect_wrapper()
+        cache_file = str(tmp_path / "plugwise.json")
+
+        def cached_smile():
+            return pw_smile.Smile(
+                host=server.host,
+                password=smile._auth.password,
+                port=server.port,
+                websession=client.session,
+                discovery_cache=pw_cache.DiscoveryCache(cache_file),
+            )
+
+        cold = cached_smile()
+        assert await cold.connect()
+        cold_data = await cold.async_update()
+        assert cold._update_metrics.discovery
+
+        # After a restart: no requests when connecting, no discovery at the first update
+        warm = cached_smile()
+        with patch.object(warm, "_request", wraps=warm._request) as request:
+            assert await warm.connect()
+            assert not request.called
+            assert warm.smile_name == "Adam"
+            # The setters wait for the validation by the first update
+            with pytest.raises(pw_exceptions.PlugwiseError, match="async_update"):
+                await warm.set_preset("f2bf9048bef64cc5b6d5110154e33c81", "home")
+            assert not request.called
+            data = await warm.async_update()
+        assert request.call_count == 1
+        assert not warm._update_metrics.discovery
+        assert data.gateway == cold_data.gateway
+        assert data.devices == cold_data.devices
+        assert warm._thermo_locs == cold._thermo_locs
+
+        # After a firmware-update the gateway is detected and discovered again
+        cache = pw_cache.DiscoveryCache(cache_file)
+        await cache.async_load()
+        entry = cache.lookup(warm._endpoint)
+        entry["firmware_version"] = "3.1.11"
+        cache.store(entry)
+        await cache.async_save()
+        upgraded = cached_smile()
+        assert await upgraded.connect()
+        assert upgraded.smile_fw_version == "3.1.11"
+        data = await upgraded.async_update()
+        assert upgraded._update_metrics.discovery
+        assert upgraded.smile_fw_version == cold.smile_fw_version
+        assert data.devices == cold_data.devices
+
+        await smile.close_connection()
+        await self.disconnect(server, client)
+
     @pytest.mark.asyncio
     async def test_adam_heatpump_cooling(self):
         """Test Adam with heatpump in cooling mode and idle."""
@@ -1853,6 +2153,16 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
             smile._last_active["5cc21042f87f4b4c94ccb5537c47a53f"] == "Werkdag schema"
         )
         assert smile.device_items == 413
+        assert len(smile._appliances) == 24
+        assert len(smile._locations) == 11
+        assert len(smile._rules) == 14
+        assert len(smile._rule_names["Thermostat presets"]) == 11
+        schedule_tag = "zone_preset_based_on_time_and_presence_with_override"
+        assert len(smile._rule_tags[schedule_tag]) == 3
+        # Not-used data is discarded while parsing
+        assert smile._domain_objects.find(".//neighbors") is None
+        assert smile._domain_objects.find("./template") is None
+        assert smile._domain_objects.find(".//zig_bee_node/mac_address") is not None
 
         await smile.close_connection()
         await self.disconnect(server, client)
@@ -2059,7 +2369,11 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
                 "select_regulation_mode": "heating",
                 "regulation_modes": ["heating", "off", "bleeding_cold", "bleeding_hot"],
                 "binary_sensors": {"plugwise_notification": False},
-                "sensors": {"outdoor_temperature": 24.9},
+                "sensors": {
+                    "outdoor_temperature": 24.9,
+                    "average_valve_position": 25.0,
+                    "maximum_valve_position": 100,
+                },
             },
             "1da4d325838e4ad8aac12177214505c9": {
                 "dev_class": "thermo_sensor",
@@ -2100,7 +2414,7 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         assert smile._last_active["06aecb3d00354375924f50c47af36bd2"] is None
         assert smile._last_active["d27aede973b54be484f6842d1b2802ad"] is None
         assert smile._last_active["13228dab8ce04617af318a2888b3c548"] is None
-        assert smile.device_items == 219
+        assert smile.device_items == 221
 
         # Negative test
         result = await self.tinker_thermostat(
@@ -3040,6 +3354,8 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         self.smile_setup = "p1v4_442_single"
         server, smile, client = await self.connect_wrapper()
         assert smile.smile_hostname == "smile000000"
+        stats = pw_metrics.SmileStats()
+        smile.add_metrics_listener(stats)
 
         _LOGGER.info("Basics:")
         _LOGGER.info(" # Assert type = power")
@@ -3052,12 +3368,70 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         assert smile.device_items == 31
         assert not self.notifications
 
+        # A not-modified domain_objects provides the previous data
+        etag = smile._etags[pw_constants.DOMAIN_OBJECTS]
+        domain_objects = smile._domain_objects
+        data = await smile.async_update()
+        assert data.devices is smile.gw_devices
+        assert smile._domain_objects is domain_objects
+        assert data.changes == pw_constants.PlugwiseChanges()
+        assert smile._etags[pw_constants.DOMAIN_OBJECTS] == etag
+
+        # The metrics of both not-modified requests, the first one followed by an update
+        summary = stats.summary()
+        assert summary["get.bytes_received"] == {
+            "count": 2,
+            "p50": 0,
+            "p90": 0,
+            "p99": 0,
+        }
+        assert summary["update.transform_time"]["count"] == 1
+        assert summary["update.devices"]["p50"] == 2
+        assert summary["update.items"]["p99"] == 31
+        assert stats.percentile("put.retries", 50) is None
+
         # Now change some data and change directory reading xml from
         # emulating reading newer dataset after an update_interval
         self.smile_setup = "updated/p1v4_442_single"
         await self.device_test(
             smile, "2022-05-16 00:00:01", testdata_updated, initialize=False
         )
+        assert "a455b61e52394b2db5081ce025a430f3" not in self.changes.devices
+        smartmeter_changes = self.changes.devices["ba4de7613517478da82dd9b6abea36af"]
+        assert "attributes" not in smartmeter_changes
+        assert "electricity_produced_peak_point" in smartmeter_changes["sensors"]
+        assert "electricity_consumed_peak_point" not in smartmeter_changes["sensors"]
+        assert not self.changes.removed_devices
+        assert stats.percentile("get.bytes_received", 100) > 0
+
+        # Parsing and processing in an executor provides the same data
+        for executor in (None, ProcessPoolExecutor(max_workers=1)):
+            offloaded = pw_smile.Smile(
+                host=server.host,
+                password=smile._auth.password,
+                port=server.port,
+                websession=client.session,
+                offload=True,
+                executor=executor,
+            )
+            offloaded_stats = pw_metrics.SmileStats()
+            offloaded.add_metrics_listener(offloaded_stats)
+            assert await offloaded.connect()
+            data = await offloaded.async_update()
+            assert offloaded_stats.percentile("get.parse_time", 50) > 0
+            assert data.devices == smile.gw_devices
+            assert data.gateway == smile.gw_data
+            # The next update collects new records, the provided ones are not changed
+            provided = json.dumps(data.devices)
+            offloaded._etags.clear()
+            offloaded._last_modified.clear()
+            new_data = await offloaded.async_update()
+            assert new_data.devices is not data.devices
+            for dev_id, device in new_data.devices.items():
+                assert device is not data.devices[dev_id]
+            assert json.dumps(data.devices) == provided
+            if executor is not None:
+                executor.shutdown()
 
         await smile.close_connection()
         await self.disconnect(server, client)
@@ -3154,7 +3528,7 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
 
     # Test connect for timeout
     @patch(
-        "plugwise.helper.ClientSession.get",
+        "aiohttp.ClientSession.get",
         side_effect=aiohttp.ServerTimeoutError,
     )
     @pytest.mark.asyncio
@@ -3172,6 +3546,217 @@ class TestPlugwise:  # pylint: disable=attribute-defined-outside-init
         except pw_exceptions.PlugwiseException:
             assert True
 
+    @pytest.mark.asyncio
+    async def test_fleet(self):
+        """Test polling several gateways concurrently, sharing one session."""
+        self.smile_setup = "p1v4_442_single"
+        servers = []
+        for fail_auth in (False, False, True):
+            app = await self.setup_app(fail_auth=fail_auth)
+            server = aiohttp.test_utils.TestServer(
+                app,
+                port=aiohttp.test_utils.unused_port(),
+                scheme="http",
+                host="127.0.0.1",
+            )
+            await server.start_server()
+            servers.append(server)
+
+        fleet = pw_fleet.SmileFleet(interval=0.01, max_per_host=1)
+        for index, server in enumerate(servers):
+            smile = fleet.add(
+                server.host, "password", port=server.port, name=f"p1_{index}"
+            )
+            assert smile._websession is fleet._websession
+        with pytest.raises(pw_exceptions.PlugwiseError):
+            fleet.add(server.host, "password", port=server.port, name="p1_0")
+
+        results = {result.name: result async for result in fleet.poll_once()}
+        assert results["p1_0"].data.devices == results["p1_1"].data.devices
+        assert (
+            results["p1_0"].data.gateway["gateway_id"]
+            == "a455b61e52394b2db5081ce025a430f3"
+        )
+        assert isinstance(results["p1_2"].error, pw_exceptions.InvalidAuthentication)
+
+        # Polling on schedule, until the iteration stops
+        fleet.remove("p1_2")
+        polled = []
+        updates = fleet.poll()
+        async for result in updates:
+            assert result.error is None
+            polled.append(result.name)
+            if len(polled) == 4:
+                break
+        await updates.aclose()
+        assert set(polled) == {"p1_0", "p1_1"}
+        assert fleet.gateways["p1_0"]._domain_objects is not None
+        assert all(gateway.task is None for gateway in fleet._gateways.values())
+
+        # An error while receiving the data is provided, the polling continues
+        smile = fleet.gateways["p1_0"]
+        async_update = smile.async_update
+        failures = [
+            aiohttp.ClientPayloadError("Response payload is not completed"),
+            asyncio.TimeoutError(),
+        ]
+
+        async def _update():
+            if failures:
+                raise failures.pop(0)
+            return await async_update()
+
+        fleet.remove("p1_1")
+        results = []
+        with patch.object(smile, "async_update", _update):
+            updates = fleet.poll()
+            async for result in updates:
+                results.append(result)
+                if len(results) == 3:
+                    break
+            await updates.aclose()
+        assert isinstance(results[0].error, aiohttp.ClientPayloadError)
+        assert isinstance(results[1].error, asyncio.TimeoutError)
+        assert results[2].data is not None
+
+        await fleet.close()
+        for server in servers:
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_fleet_fast_refresh(self):
+        """Test the fleet polling again shortly after a write."""
+        self.smile_setup = "p1v4_442_single"
+        server, smile, client = await self.connect()
+        fleet = pw_fleet.SmileFleet(
+            interval=3600, jitter=0, adaptive=True, fast_refresh=0.01
+        )
+        smile = fleet.add(server.host, "password", port=server.port)
+        scheduler = fleet._gateways[server.host].scheduler
+        assert scheduler.interval == 300.0
+        assert scheduler.fast_refresh == 0.01
+        # The fast refresh of the scheduler of the gateway is used
+        fleet._fast_refresh = 3600
+
+        updates = fleet.poll()
+        result = await updates.__anext__()
+        assert result.data is not None
+        await smile.delete_notification()
+        result = await asyncio.wait_for(updates.__anext__(), 5)
+        assert result.data is not None
+        await updates.aclose()
+
+        fleet.remove(server.host)
+        assert not smile._write_listeners
+        await fleet.close()
+        await self.disconnect(server, client)
+
+    async def test_adaptive_scheduler(self):
+        """Test the polling interval following the change rate of the data."""
+        scheduler = pw_scheduler.AdaptiveScheduler(
+            interval=60, min_interval=5, max_interval=300
+        )
+        power = pw_constants.PlugwiseChanges(
+            devices={"meter": {"sensors": {"net_electricity_point"}}}
+        )
+        # The first update, showing all data as changed, is not counted
+        assert scheduler.update(power) == 60
+        intervals = [scheduler.update(power) for _ in range(6)]
+        assert intervals == [60, 30, 15, 7.5, 5, 5]
+        assert scheduler.field_rates["meter/sensors/net_electricity_point"] > 0.8
+
+        # Back off when nothing changes
+        for _ in range(40):
+            interval = scheduler.update(pw_constants.PlugwiseChanges())
+        assert interval == 300
+        assert not scheduler.field_rates
+        assert scheduler.change_rate < 0.001
+
+    async def test_format_measure(self):
+        """Test format_measure() against the original, for all fixture values and all units."""
+
+        def formatted(function, measure, unit):
+            try:
+                result = function(measure, unit)
+            except (OverflowError, ValueError) as err:
+                return type(err)
+            # Compare the representation: the type, the sign of zero and NaN included
+            return type(result), repr(result)
+
+        userdata = os.path.join(os.path.dirname(__file__), "../userdata")
+        measures = {
+            "-0.0001",
+            "-0.004",
+            "0.995",
+            "1.005",
+            "1e3",
+            "9.995",
+            "99.95",
+            "+7",
+            " 21 ",
+            "1_000",
+            "inf",
+            "-inf",
+            "nan",
+            "on",
+        }
+        for path in glob.glob(os.path.join(userdata, "*", "core.*.xml")):
+            measures.update(
+                item.text.strip()
+                for item in etree.parse(path).iter()
+                if item.text and item.text.strip()
+            )
+        for value in range(-5000, 5000):
+            measures.update((str(value), f"{value / 1000:.3f}", f"{value / 200:.4f}"))
+
+        units = {
+            pw_constants.ELECTRIC_POTENTIAL_VOLT,
+            pw_constants.ENERGY_KILO_WATT_HOUR,
+            pw_constants.NONE,
+            pw_constants.PERCENTAGE,
+            pw_constants.TEMP_CELSIUS,
+            pw_constants.VOLUME_CUBIC_METERS,
+        }
+        for measurements in (
+            pw_constants.DEVICE_MEASUREMENTS,
+            pw_constants.HEATER_CENTRAL_MEASUREMENTS,
+            pw_constants.P1_MEASUREMENTS,
+        ):
+            units.update(attrs.unit_of_measurement for attrs in measurements.values())
+
+        for measure in measures:
+            for unit in units:
+                assert formatted(pw_util.format_measure, measure, unit) == formatted(
+                    format_measure_reference, measure, unit
+                ), (measure, unit)
+
+    async def test_import_time(self):
+        """Test the heavy modules are imported on first use, not by import plugwise."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import plugwise"],
+            capture_output=True,
+            check=True,
+            cwd=os.path.join(os.path.dirname(__file__), ".."),
+            text=True,
+        )
+        lines = [
+            line.split("|")
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:")
+        ]
+        imported = {line[2].strip() for line in lines}
+        assert "plugwise" in imported
+        for module in (
+            "aiohttp",
+            "concurrent.futures.process",
+            "dateutil",
+            "defusedxml",
+            "semver",
+            "xml.etree.ElementTree",
+        ):
+            assert module not in imported
+        _LOGGER.info("import plugwise: %s us", lines[-1][1].strip())
+
     class PlugwiseTestError(Exception):
         """Plugwise test exceptions class."""
 